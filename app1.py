@@ -1,43 +1,63 @@
 import streamlit as st
-import pandas as pd
-import random
+from qa_quiz import Quiz
+from qa_resources import load_store
 
 # =============================
-# 1. Data (Directly Inside Code)
+# 1. Data (shared with app.py)
 # =============================
-data = [
-    {"class": "FSc Part 1", "chapter": "Cell Biology", "question": "What is the basic unit of life?", "answer": "Cell"},
-    {"class": "FSc Part 1", "chapter": "Biomolecules", "question": "Which biomolecule stores genetic information?", "answer": "DNA"},
-    {"class": "FSc Part 1", "chapter": "Enzymes", "question": "Enzymes act as?", "answer": "Catalysts"},
-    {"class": "FSc Part 2", "chapter": "Human Physiology", "question": "Which organ pumps blood?", "answer": "Heart"},
-    {"class": "FSc Part 2", "chapter": "Human Physiology", "question": "What is the functional unit of kidney?", "answer": "Nephron"},
-    {"class": "FSc Part 2", "chapter": "Genetics", "question": "Who is called the father of genetics?", "answer": "Gregor Mendel"},
-    {"class": "MDCAT", "chapter": "Cell Division", "question": "Mitosis results in how many daughter cells?", "answer": "2"},
-    {"class": "MDCAT", "chapter": "Cell Division", "question": "Meiosis results in how many daughter cells?", "answer": "4"},
-    {"class": "MDCAT", "chapter": "Human Blood", "question": "What is the universal donor blood group?", "answer": "O-"},
-    {"class": "MDCAT", "chapter": "Human Blood", "question": "What is the universal recipient blood group?", "answer": "AB+"},
-    # ---- آپ یہاں مزید MCQs add کر سکتے ہیں اسی pattern پر ----
-]
-
-# Convert list into DataFrame
-df = pd.DataFrame(data)
+# Questions come from the same bank as the chatbot (built-in MCQS in mcqs.py,
+# or the saved index in BIO_QA_INDEX); per-(class, chapter) row ids are
+# precomputed in its facet index, so a click never filters or copies the bank.
+# ---- مزید MCQs کے لیے mcqs.py میں اسی pattern پر add کریں ----
+store = load_store()
+facets = store.facets
+quiz = st.session_state.setdefault("quiz", Quiz())
 
 # =============================
 # 2. Streamlit App UI
 # =============================
 st.title("📘 Biology MCQs Quiz App")
 
-# Select Class & Chapter
-selected_class = st.selectbox("Select Class", df["class"].unique())
-filtered_df = df[df["class"] == selected_class]
+# Select Class & Chapters (several chapters give a mixed quiz)
+selected_class = st.selectbox("Select Class", list(facets.classes))
+chapter_counts = facets.chapters_by_class.get(selected_class, {})
+selected_chapters = st.multiselect("Select Chapters", list(chapter_counts), default=list(chapter_counts)[:1],
+                                   format_func=lambda ch: f"{ch} ({chapter_counts[ch]})")
+weighted = st.checkbox("Focus on weak chapters", help="Chapters you mark wrong more often come up more often.")
+keys = [(selected_class, ch) for ch in selected_chapters]
 
-selected_chapter = st.selectbox("Select Chapter", filtered_df["chapter"].unique())
-chapter_df = filtered_df[filtered_df["chapter"] == selected_chapter]
 
-# Pick a random question
-if st.button("Next Question"):
-    q = random.choice(chapter_df.to_dict(orient="records"))
+def next_question():
+    _, new_round = quiz.draw(facets, keys, weighted=weighted)
+    if new_round:
+        st.toast("You've seen every question here; starting a new round.")
+
+
+def reveal():
+    quiz.revealed = True
+
+
+def mark(correct):
+    quiz.record(correct)
+    next_question()
+
+
+# Callbacks update session state before the rerun, so the current question
+# and its answer stay on screen across reruns.
+st.button("Next Question", on_click=next_question, disabled=not keys)
+
+if quiz.current is not None:
+    q = store.row(quiz.current[0])
     st.subheader("❓ " + q["question"])
-    
-    if st.button("Show Answer"):
+    st.caption(f"Class {q['class']} • {q['chapter']}")
+    if not quiz.revealed:
+        st.button("Show Answer", on_click=reveal)
+    else:
         st.success("✅ Answer: " + q["answer"])
+        c1, c2 = st.columns(2)
+        c1.button("I got it right", on_click=mark, args=(True,))
+        c2.button("I got it wrong", on_click=mark, args=(False,))
+
+if keys:
+    seen, total = quiz.progress(facets, keys)
+    st.caption(f"{seen} of {total} questions seen this round")
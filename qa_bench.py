@@ -0,0 +1,250 @@
+# qa_bench.py — Headless benchmarks of the Q/A bank versus corpus size.
+# Synthesizes banks with the class, chapter, question, answer schema (the
+# built-in MCQS rows plus generated ones) and measures, per size:
+#   - CSV ingest and index build time, and peak RSS (each size runs in its own
+#     process, so the high-water mark belongs to that size);
+#   - retrieve_answer latency p50/p99: the call path of app.py, i.e.
+#     BatchingRetriever.search with the result cache off, with and without a
+#     class/chapter filter, plus the engine's own scoring time;
+#   - rerun stages: upload merge (add_rows of a CSV with new and duplicate
+#     rows), filter (options + facet rows) and CSV export (to_csv).
+# --answers 4 gives the generated rows lettered answers ("A".."D"), so the
+# upload's near-duplicate check runs against large same-answer groups.
+# Results are written as JSON tagged with the git commit; `compare` diffs two
+# result files and exits non-zero on regressions. No Streamlit server needed.
+# How to run:
+#   python qa_bench.py run --sizes 1000 10000 100000 1000000 --out bench_results
+#   python qa_bench.py run --sizes 200000 --answers 4
+#   python qa_bench.py compare bench_results/<old>.json bench_results/<new>.json
+
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from mcqs import MCQS
+from qa_cache import QueryCache
+from qa_index import QAIndex
+from qa_lsa import MODES, LSAIndex
+from qa_service import BatchingRetriever
+from qa_store import COLUMNS, QuestionStore, file_sha1, peak_rss_mb, read_mcq_csv
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+STEMS = ["What is", "Which", "Where does", "Define", "Name the", "How does", "What are", "Which process"]
+
+# Metrics where a larger value is worse, compared by `compare`.
+LOWER_IS_BETTER = re.compile(r"(_ms|_s|_mb)$")
+
+
+def synth_bank(rows, seed=0, answers=0):
+    # `rows` rows: the built-in bank, then generated questions whose terms
+    # follow a Zipf-like law over a vocabulary that grows with the bank.
+    # Generated answers are unique, or with answers=k one of k letters.
+    rng = np.random.default_rng(seed)
+    base = pd.DataFrame(MCQS, columns=COLUMNS)
+    n = max(rows - len(base), 0)
+    words = sorted({w for t in base["question"].tolist() + base["answer"].tolist()
+                    for w in re.findall(r"[a-z]{3,}", t.lower())})
+    vocab = np.asarray(words + [f"term{k}" for k in range(max(2_000, rows // 20))], dtype=object)
+    p = 1.0 / (np.arange(len(vocab)) + 10.0)
+    p /= p.sum()
+    ids = rng.choice(len(vocab), size=(n, 8), p=p)
+    lens = rng.integers(3, 9, size=n)
+    stems = rng.integers(0, len(STEMS), size=n)
+    chapters = {c: sorted(base.loc[base["class"] == c, "chapter"].unique()) + [f"Chapter {k}" for k in range(1, 21)]
+                for c in base["class"].unique()}
+    classes = np.asarray(sorted(chapters), dtype=object)
+    cls = classes[rng.integers(0, len(classes), size=n)]
+    chap_pick = rng.integers(0, 1 << 30, size=n)
+    gen = pd.DataFrame({
+        "class": cls,
+        "chapter": [chapters[c][k % len(chapters[c])] for c, k in zip(cls, chap_pick)],
+        "question": [f"{STEMS[s]} {' '.join(vocab[r[:m]])}?" for s, r, m in zip(stems, ids, lens)],
+        "answer": ([chr(ord("A") + k) for k in rng.integers(0, answers, size=n)] if answers else
+                   [" ".join(vocab[r[-2:]]).capitalize() + f" {k}" for k, r in enumerate(ids)]),
+    })
+    return pd.concat([base, gen], ignore_index=True).iloc[:rows]
+
+
+def _percentiles(times):
+    return round(float(np.percentile(times, 50)) * 1000, 3), round(float(np.percentile(times, 99)) * 1000, 3)
+
+
+def _queries(df, count, rng):
+    # Bank questions with one term dropped, and the filter of their row.
+    out = []
+    for i in rng.choice(len(df), size=count, replace=len(df) < count):
+        words = str(df["question"].iat[i]).split()
+        if len(words) > 3:
+            del words[rng.integers(1, len(words))]
+        chap = df["chapter"].iat[i] if rng.random() < 0.5 else "All"
+        out.append((" ".join(words), str(df["class"].iat[i]), str(chap)))
+    return out
+
+
+def bench_size(rows, mode="tfidf", queries=200, window_ms=5.0, upload_rows=None, seed=0, answers=0):
+    # Runs every measurement for one bank size; called in a fresh process.
+    res = {"rows": rows, "mode": mode, "answers": answers, "rss_start_mb": peak_rss_mb()}
+    rng = np.random.default_rng(seed + 1)
+    upload_rows = upload_rows or max(100, rows // 100)
+    df = synth_bank(rows + upload_rows, seed, answers)
+    df, fresh = df.iloc[:rows], df.iloc[rows:]
+    with tempfile.TemporaryDirectory() as tmp:
+        bank_csv, upload_csv = os.path.join(tmp, "bank.csv"), os.path.join(tmp, "upload.csv")
+        df.to_csv(bank_csv, index=False)
+        dups = df.iloc[rng.choice(len(df), size=max(1, upload_rows // 10), replace=False)]
+        pd.concat([fresh, dups]).to_csv(upload_csv, index=False)
+
+        start = time.perf_counter()
+        store = QuestionStore(list(read_mcq_csv(bank_csv)))
+        res["ingest_s"] = round(time.perf_counter() - start, 3)
+        start = time.perf_counter()
+        index = QAIndex(store)
+        res["build_s"] = round(time.perf_counter() - start, 3)
+        engine = None
+        if mode != "tfidf":
+            start = time.perf_counter()
+            engine = LSAIndex(index, mode=mode)
+            res["lsa_build_s"] = round(time.perf_counter() - start, 3)
+        res["rss_after_build_mb"] = peak_rss_mb()
+
+        retriever = BatchingRetriever(index, window_ms=window_ms, cache=QueryCache(0), engine=engine)
+        qs = _queries(df, queries, rng)
+        scorer = engine if engine is not None else index
+        for name, filtered in (("all", False), ("filtered", True)):
+            times, score_times = [], []
+            for q, c, ch in qs:
+                c, ch = (c, ch) if filtered else ("All", "All")
+                start = time.perf_counter()
+                retriever.search(q, topk=5, sel_class=c, sel_chap=ch)
+                times.append(time.perf_counter() - start)
+                start = time.perf_counter()
+                scorer.search_batch([q], topk=5, filters=[(c, ch)])
+                score_times.append(time.perf_counter() - start)
+            res[f"retrieve_{name}_p50_ms"], res[f"retrieve_{name}_p99_ms"] = _percentiles(times)
+            res[f"score_{name}_p50_ms"], res[f"score_{name}_p99_ms"] = _percentiles(score_times)
+
+        start = time.perf_counter()
+        with open(upload_csv, "rb") as f:
+            merged = retriever.add_rows(read_mcq_csv(f), source=file_sha1(f))
+        res["upload_merge_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        res["upload_rows"], res["upload_added"] = len(fresh) + len(dups), merged["added"]
+
+        times = []
+        for _, c, _ in qs[:50]:
+            start = time.perf_counter()
+            chapters = retriever.options(c)["chapter"]
+            retriever.options()
+            index.store.facets.rows(c, next(iter(chapters), "All"))
+            times.append(time.perf_counter() - start)
+        res["filter_ms"] = _percentiles(times)[0]
+
+        start = time.perf_counter()
+        csv = retriever.to_csv()
+        res["export_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        res["export_mb"] = round(len(csv.encode()) / 2**20, 3)
+        res["rerun_ms"] = round(res["upload_merge_ms"] + res["filter_ms"] + res["retrieve_filtered_p50_ms"]
+                                + res["export_ms"], 3)
+    res["peak_rss_mb"] = peak_rss_mb()
+    return res
+
+
+def _commit():
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                               text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run(args):
+    report = {"commit": _commit(), "created": time.time(), "python": sys.version.split()[0],
+              "platform": platform.platform(), "mode": args.mode, "queries": args.queries,
+              "window_ms": args.window_ms, "answers": args.answers, "results": []}
+    for rows in args.sizes:
+        cmd = [sys.executable, os.path.abspath(__file__), "size", "--rows", str(rows), "--mode", args.mode,
+               "--queries", str(args.queries), "--window-ms", str(args.window_ms), "--seed", str(args.seed),
+               "--answers", str(args.answers)]
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        if proc.returncode != 0:
+            sys.stderr.write(proc.stderr)
+            raise SystemExit(f"benchmark for {rows} rows failed")
+        res = json.loads(proc.stdout.strip().splitlines()[-1])
+        report["results"].append(res)
+        print(f"{rows:>9} rows  build {res['build_s']:.2f}s  retrieve p50/p99 {res['retrieve_all_p50_ms']:.1f}/"
+              f"{res['retrieve_all_p99_ms']:.1f} ms  rerun {res['rerun_ms']:.0f} ms  peak RSS {res['peak_rss_mb']:.0f} MB")
+    os.makedirs(args.out, exist_ok=True)
+    suffix = f"-answers{args.answers}" if args.answers else ""
+    path = os.path.join(args.out, f"bench-{report['commit']}-{args.mode}{suffix}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {path}")
+
+
+def compare(args):
+    # Prints every timing/memory metric of both runs per size; a metric that
+    # grew by more than `threshold` (relative, and by min_ms for *_ms timings)
+    # counts as a regression.
+    with open(args.old, encoding="utf-8") as f:
+        old = {r["rows"]: r for r in json.load(f)["results"]}
+    with open(args.new, encoding="utf-8") as f:
+        new = {r["rows"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    for rows in sorted(set(old) & set(new)):
+        print(f"{rows} rows")
+        for key in sorted(set(old[rows]) & set(new[rows])):
+            a, b = old[rows][key], new[rows][key]
+            if not LOWER_IS_BETTER.search(key) or not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+                continue
+            change = (b - a) / a if a else 0.0
+            flag = ""
+            if change > args.threshold and (b - a > args.min_ms or not key.endswith("_ms")):
+                flag = "  REGRESSION"
+                regressions += 1
+            print(f"  {key:28s} {a:>12.3f} -> {b:>12.3f}  {change:+.1%}{flag}")
+    if regressions:
+        raise SystemExit(f"{regressions} metric(s) regressed by more than {args.threshold:.0%}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks of the Biology Q/A bank versus corpus size")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    rp = sub.add_parser("run", help="benchmark each size in its own process and write a JSON report")
+    rp.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    rp.add_argument("--out", default="bench_results", help="directory for the JSON report")
+    op = sub.add_parser("size", help="benchmark one size and print its JSON (used by run)")
+    op.add_argument("--rows", type=int, required=True)
+    for p in (rp, op):
+        p.add_argument("--mode", choices=MODES, default="tfidf", help="retrieval engine")
+        p.add_argument("--queries", type=int, default=200, help="timed questions per size")
+        p.add_argument("--window-ms", type=float, default=5.0, help="batching window, as in app.py")
+        p.add_argument("--seed", type=int, default=0)
+        p.add_argument("--answers", type=int, default=0, help="letter answers per generated row (0: unique answers)")
+    cp = sub.add_parser("compare", help="compare two JSON reports")
+    cp.add_argument("old")
+    cp.add_argument("new")
+    cp.add_argument("--threshold", type=float, default=0.2, help="relative increase reported as a regression")
+    cp.add_argument("--min-ms", type=float, default=1.0, help="ignore smaller increases of *_ms timings (noise)")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "run":
+        run(args)
+    elif args.cmd == "compare":
+        compare(args)
+    else:
+        print(json.dumps(bench_size(args.rows, args.mode, args.queries, args.window_ms, seed=args.seed,
+                                    answers=args.answers)))
+
+
+if __name__ == "__main__":
+    main()
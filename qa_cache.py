@@ -0,0 +1,106 @@
+# qa_cache.py — Process-wide LRU/TTL cache of top-k search results.
+# Keys are (weights version, normalized query, class, chapter, topk); see
+# QAIndex.normalize. An upload only drops entries whose filter covers the new
+# rows or whose query uses a term the upload added to the vocabulary; an IDF
+# rebalance changes the weights version, so older entries simply stop matching.
+
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Size limit (entries, 0 disables) and TTL (seconds) for app.py and qa_service.py.
+CACHE_SIZE = int(os.environ.get("BIO_QA_CACHE_SIZE", 2048))
+CACHE_TTL = float(os.environ.get("BIO_QA_CACHE_TTL", 3600))
+
+
+def _entry_bytes(key, results):
+    # Rough footprint of one entry: key strings plus result strings.
+    size = sys.getsizeof(key) + sum(sys.getsizeof(k) for k in key)
+    for _, row in results:
+        size += 64 + sum(sys.getsizeof(v) for v in row.values())
+    return size
+
+
+class QueryCache:
+    def __init__(self, maxsize=CACHE_SIZE, ttl=CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.epoch = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+        self.bytes = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            expires, size, _, results = item
+            if expires < time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return results
+
+    def put(self, key, tokens, results, epoch):
+        # tokens: set of query terms, used by invalidate(). Results computed
+        # before an invalidation (epoch mismatch) are not stored.
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if epoch != self.epoch:
+                return
+            if key in self._data:
+                self._drop(key)
+            size = _entry_bytes(key, results)
+            self._data[key] = (time.monotonic() + self.ttl, size, tokens, results)
+            self.bytes += size
+            while len(self._data) > self.maxsize:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _drop(self, key):
+        self.bytes -= self._data.pop(key)[1]
+
+    def invalidate(self, changes):
+        # changes: {"class": [...], "chapter": [...], "pair": [[class, chapter], ...],
+        # "terms": [...]} as returned by QAIndex.add_rows.
+        classes, chapters = set(changes["class"]), set(changes["chapter"])
+        pairs, terms = {tuple(p) for p in changes["pair"]}, set(changes["terms"])
+        with self._lock:
+            self.epoch += 1
+            stale = []
+            for key, (_, _, tokens, _) in self._data.items():
+                _, _, sel_class, sel_chap, _ = key
+                if sel_class == "All" and sel_chap == "All":
+                    hit = bool(pairs)
+                elif sel_chap == "All":
+                    hit = sel_class in classes
+                elif sel_class == "All":
+                    hit = sel_chap in chapters
+                else:
+                    hit = (sel_class, sel_chap) in pairs
+                if hit or tokens & terms:
+                    stale.append(key)
+            for key in stale:
+                self._drop(key)
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"size": len(self._data), "maxsize": self.maxsize, "ttl": self.ttl,
+                "hits": self.hits, "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions, "expirations": self.expirations,
+                "invalidations": self.invalidations, "bytes": self.bytes}
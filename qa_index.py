@@ -0,0 +1,556 @@
+# qa_index.py — Live TF-IDF index over the Biology Q/A bank.
+# The index is built once per dataset version and shared by every Streamlit
+# session (see load_index in qa_resources.py); a query only does transform +
+# similarity. A session's uploads go to its own fork() of the shared index.
+# Uploaded rows are appended incrementally: only the new rows are vectorized,
+# the vocabulary and document frequencies grow in place, and IDF weights are
+# rebalanced lazily once the bank has grown by `rebalance_ratio`.
+# Rows live in a qa_store.QuestionStore; uploads are consumed chunk by chunk.
+# save() writes the index as a directory of .npy arrays plus meta.json, and
+# open() memory-maps it so worker processes start fast and share pages:
+#   python qa_service.py build --out bio_index --csv extra.csv
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from qa_metrics import span
+from qa_store import QuestionStore, compact, dataset_version
+
+# Near-duplicate threshold: same answer and question cosine at least this high.
+NEAR_DUP_SIM = 0.9
+# Answers shared by more bank rows than this are matched by a sparse product
+# instead of pair by pair (see QAIndex._near_duplicates).
+NEAR_DUP_GROUP = 64
+
+# Bump when the on-disk layout written by QAIndex.save changes.
+FORMAT_VERSION = 2
+
+
+class StaleIndexError(ValueError):
+    # A saved index that doesn't match this code or the current built-in bank.
+    pass
+
+
+def topk_desc(scores, k):
+    # Indices of the k largest scores, best first, without a full argsort.
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k >= len(scores):
+        return np.argsort(scores)[::-1]
+    part = np.argpartition(scores, -k)[-k:]
+    return part[np.argsort(scores[part])[::-1]]
+
+
+def norm_text(s):
+    return " ".join(re.findall(r"\w+", str(s).lower()))
+
+
+def text_keys(values):
+    # 64-bit hashes of normalized text, for exact and same-answer matching.
+    return pd.util.hash_array(np.asarray([norm_text(v) for v in values], dtype=object))
+
+
+def row_keys(question_keys, answer_keys):
+    return question_keys ^ (answer_keys * np.uint64(0x9E3779B97F4A7C15))
+
+
+def _sha1_file(path, block=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(block), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+
+class Vocabulary:
+    # Term -> column id. A saved index brings a sorted, memory-mapped term
+    # list (ids 0..n-1, found by binary search), and a fork() looks up ids
+    # 0..n-1 in its parent; later terms go in a dict.
+    def __init__(self, blob=None, offsets=None):
+        self._blob, self._offsets = blob, offsets
+        self._parent = None
+        self._nbase = 0 if offsets is None else len(offsets) - 1
+        self._extra = {}
+        self._terms = []
+
+    def __len__(self):
+        return self._nbase + len(self._extra)
+
+    def _base(self, i):
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]])
+
+    def fork(self):
+        # Vocabulary over this one's current terms; terms added to either side
+        # afterwards are not seen by the other.
+        new = Vocabulary()
+        new._parent, new._nbase = self, len(self)
+        return new
+
+    def term(self, i):
+        if i >= self._nbase:
+            return self._terms[i - self._nbase]
+        if self._parent is not None:
+            return self._parent.term(i)
+        return self._base(i).decode("utf-8")
+
+    def get(self, tok):
+        j = self._extra.get(tok)
+        if j is None and self._parent is not None:
+            j = self._parent.get(tok)
+            if j is not None and j >= self._nbase:
+                j = None
+        elif j is None and self._nbase:
+            key, lo, hi = tok.encode("utf-8"), 0, self._nbase
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self._base(mid) < key:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            if lo < self._nbase and self._base(lo) == key:
+                j = lo
+        return j
+
+    def add(self, tok):
+        j = self._extra[tok] = len(self)
+        self._terms.append(tok)
+        return j
+
+    def terms_since(self, n):
+        # Terms with id >= n, in id order (n is at least the mapped size).
+        return self._terms[n - self._nbase:]
+
+    def terms(self):
+        return [self.term(i) for i in range(self._nbase)] + self._terms
+
+
+def _l2_normalize(X):
+    norms = np.sqrt(np.asarray(X.multiply(X).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.csr_matrix(sp.diags(1.0 / norms) @ X, dtype=np.float32)
+
+
+class QAIndex:
+    def __init__(self, data, version=None, rebalance_ratio=0.1):
+        # Same tokenization as TfidfVectorizer(ngram_range=(1,2), stop_words="english");
+        # weights follow its defaults (raw tf, smooth idf, l2 rows).
+        self.analyzer = TfidfVectorizer(ngram_range=(1,2), stop_words="english").build_analyzer()
+        self.rebalance_ratio = rebalance_ratio
+        self.vocab = Vocabulary()
+        self.doc_freq = np.zeros(0, dtype=np.int64)
+        self.sources = set()
+        self._lock = threading.RLock()
+        store = data if isinstance(data, QuestionStore) else QuestionStore.from_frame(data)
+        tf = self._count(store.column("question"))
+        self.doc_freq = self._grown_doc_freq(tf)
+        # Sorted (question, answer) keys and per-row answer keys for dedup.
+        self._answer_keys = text_keys(store.column("answer"))
+        self._keys = np.unique(row_keys(text_keys(store.column("question")), self._answer_keys))
+        self._n_weighted = len(store)
+        idf = self._idf(len(store))
+        # Readers take this tuple as one consistent snapshot; writers replace it.
+        # Each block is (raw term counts, weighted rows) over the vocabulary
+        # size at the time it was built.
+        self._state = (store, idf, [(tf, self._weigh(tf, idf))])
+        self.version = self.base_version = version or dataset_version(store)
+        # Changes only when IDF weights are recomputed; part of result-cache keys.
+        self.weights_version = self.version
+
+    def __len__(self):
+        return len(self._state[0])
+
+    @property
+    def store(self):
+        return self._state[0]
+
+    def fork(self):
+        # Copy that takes its own uploads (one session's, in app.py) while
+        # sharing everything built so far: add_rows and rebalancing replace
+        # the rows, weights and keys rather than changing them, so only the
+        # vocabulary and the applied sources need a layer of their own.
+        with self._lock:
+            new = QAIndex.__new__(QAIndex)
+            new.__dict__.update(self.__dict__)
+            new.vocab = self.vocab.fork()
+            new.sources = set(self.sources)
+            new._lock = threading.RLock()
+            return new
+
+    # -----------------------------
+    # Vectorizing
+    # -----------------------------
+    def _count(self, docs, grow=True, vocab_size=None):
+        # Raw term counts as CSR; new terms get ids only when grow=True.
+        indices, indptr = [], [0]
+        limit = vocab_size if vocab_size is not None else float("inf")
+        for doc in docs:
+            for tok in self.analyzer(doc):
+                j = self.vocab.get(tok)
+                if j is None and grow:
+                    j = self.vocab.add(tok)
+                if j is not None and j < limit:
+                    indices.append(j)
+            indptr.append(len(indices))
+        ncols = len(self.vocab) if vocab_size is None else vocab_size
+        X = sp.csr_matrix((np.ones(len(indices), dtype=np.float32), np.asarray(indices, dtype=np.int32),
+                           np.asarray(indptr, dtype=np.int64)), shape=(len(indptr) - 1, ncols))
+        X.sum_duplicates()
+        return X
+
+    def _grown_doc_freq(self, tf):
+        grown = np.zeros(len(self.vocab), dtype=np.int64)
+        grown[:len(self.doc_freq)] = self.doc_freq
+        grown[:tf.shape[1]] += np.bincount(tf.indices, minlength=tf.shape[1])
+        return grown
+
+    def _idf(self, n_docs, doc_freq=None):
+        doc_freq = self.doc_freq if doc_freq is None else doc_freq
+        return (np.log((1 + n_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+
+    def _weigh(self, tf, idf):
+        # TF-IDF rows, l2-normalized; shares tf's indices/indptr arrays.
+        data = tf.data * idf[tf.indices]
+        rows = np.repeat(np.arange(tf.shape[0]), np.diff(tf.indptr))
+        norms = np.sqrt(np.bincount(rows, weights=data.astype(np.float64) ** 2, minlength=tf.shape[0]))
+        norms[norms == 0] = 1.0
+        return sp.csr_matrix(((data / norms[rows]).astype(np.float32), tf.indices, tf.indptr), shape=tf.shape)
+
+    # -----------------------------
+    # Incremental updates
+    # -----------------------------
+    def add_rows(self, data, source=None):
+        # Appends uploaded rows (a DataFrame or an iterable of chunks, e.g. from
+        # qa_store.read_mcq_csv); returns counts of added and collapsed rows.
+        # A source (e.g. the file hash) that was already applied is a no-op.
+        with self._lock:
+            # "changes" lists the facets that gained rows and the new terms,
+            # for targeted invalidation of cached results (qa_cache).
+            res = {"added": 0, "exact_dups": 0, "near_dups": 0, "skipped": False,
+                   "changes": {"class": [], "chapter": [], "pair": [], "terms": []}}
+            if source is not None and source in self.sources:
+                return dict(res, skipped=True)
+            n_terms, pairs = len(self.vocab), set()
+            for chunk in ([data] if isinstance(data, pd.DataFrame) else data):
+                added = self._add_chunk(compact(chunk), res)
+                if added is not None:
+                    pairs.update(added.groupby(["class", "chapter"], observed=True).groups)
+            res["changes"] = {"class": sorted({c for c, _ in pairs}), "chapter": sorted({ch for _, ch in pairs}),
+                              "pair": sorted(pairs), "terms": [t for t, f in zip(self.vocab.terms_since(n_terms), self.doc_freq[n_terms:]) if f]}
+            if source is not None:
+                self.sources.add(source)
+                self.version = hashlib.sha1((self.version + source).encode()).hexdigest()[:16]
+            return res
+
+    def _add_chunk(self, new, res):
+        store, idf, blocks = self._state
+        answer_keys = text_keys(new["answer"])
+        keys = row_keys(text_keys(new["question"]), answer_keys)
+        _, first = np.unique(keys, return_index=True)
+        keep = np.sort(first[~np.isin(keys[first], self._keys)])
+        res["exact_dups"] += len(new) - len(keep)
+        new, keys, answer_keys = new.iloc[keep].reset_index(drop=True), keys[keep], answer_keys[keep]
+
+        tf = self._count(new["question"])
+        fresh = self._idf(len(store) + len(new), self._grown_doc_freq(tf))
+        near = self._near_duplicates(tf, answer_keys, np.concatenate([idf, fresh[len(idf):]]), blocks)
+        if near.any():
+            new, tf = new[~near].reset_index(drop=True), tf[np.flatnonzero(~near)]
+            keys, answer_keys = keys[~near], answer_keys[~near]
+        res["near_dups"] += int(near.sum())
+        res["added"] += len(new)
+        if len(new) == 0:
+            return None
+
+        self.doc_freq = self._grown_doc_freq(tf)
+        self._keys = np.union1d(self._keys, keys)
+        self._answer_keys = np.concatenate([self._answer_keys, answer_keys])
+        store = store.append(new)
+        # Existing rows keep their weights; terms first seen in this upload
+        # get their IDF now, and everything is rebalanced lazily later.
+        idf = np.concatenate([idf, self._idf(len(store))[len(idf):]])
+        self._state = (store, idf, blocks + [(tf, self._weigh(tf, idf))])
+        return new
+
+    def _near_duplicates(self, tf, answer_keys, idf, blocks, pair_batch=200_000, product_cells=4_000_000):
+        # An uploaded row is a near-duplicate when an existing row with the
+        # same answer has question cosine >= NEAR_DUP_SIM. Rows whose answer
+        # at most NEAR_DUP_GROUP bank rows share are scored pair by pair. A
+        # common answer ("A".."D", "True") is handled as a sparse product of
+        # its new rows with its bank rows instead, which only costs for pairs
+        # sharing a term, so the work doesn't grow with uploads x group size.
+        dup = np.zeros(tf.shape[0], dtype=bool)
+        order = np.argsort(self._answer_keys, kind="stable")
+        lo = np.searchsorted(self._answer_keys[order], answer_keys, side="left")
+        counts = np.searchsorted(self._answer_keys[order], answer_keys, side="right") - lo
+        if counts.sum() == 0:
+            return dup
+        W = self._weigh(tf, idf)
+        large = counts > NEAR_DUP_GROUP
+        for key in np.unique(answer_keys[large]):
+            news = np.flatnonzero(large & (answer_keys == key))
+            olds = np.sort(order[lo[news[0]]:lo[news[0]] + counts[news[0]]])
+            offset = 0
+            for _, X in blocks:
+                rows = olds[(olds >= offset) & (olds < offset + X.shape[0])] - offset
+                offset += X.shape[0]
+                if not len(rows):
+                    continue
+                A = X[rows]
+                step = max(1, product_cells // len(rows))
+                for p in range(0, len(news), step):
+                    part = news[p:p + step]
+                    S = (A @ W[part][:, :X.shape[1]].T).tocoo()
+                    dup[part[np.unique(S.col[S.data >= NEAR_DUP_SIM])]] = True
+        counts = np.where(large, 0, counts)
+        new_ids = np.repeat(np.arange(len(counts)), counts)
+        starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+        old_ids = order[starts + np.arange(len(new_ids))]
+        for p in range(0, len(new_ids), pair_batch):
+            olds, news, offset = old_ids[p:p + pair_batch], new_ids[p:p + pair_batch], 0
+            for _, X in blocks:
+                sel = (olds >= offset) & (olds < offset + X.shape[0])
+                if sel.any():
+                    A = X[olds[sel] - offset]
+                    B = W[news[sel]][:, :X.shape[1]]
+                    sims = np.asarray(A.multiply(B).sum(axis=1)).ravel()
+                    dup[news[sel][sims >= NEAR_DUP_SIM]] = True
+                offset += X.shape[0]
+        return dup
+
+    def _maybe_rebalance(self, force=False):
+        # Recomputes IDF over the whole bank and reweights it as one block
+        # once the bank has grown enough since the last rebalance.
+        if not force and len(self) <= self._n_weighted * (1 + self.rebalance_ratio):
+            return
+        with self._lock:
+            store, idf, blocks = self._state
+            if len(blocks) == 1 and len(store) == self._n_weighted:
+                return
+            if not force and len(store) <= self._n_weighted * (1 + self.rebalance_ratio):
+                return
+            tf = sp.vstack([sp.csr_matrix((b.data, b.indices, b.indptr), shape=(b.shape[0], len(self.vocab)))
+                            for b, _ in blocks], format="csr")
+            idf = self._idf(len(store))
+            self._state = (store, idf, [(tf, self._weigh(tf, idf))])
+            self._n_weighted = len(store)
+            self.weights_version = hashlib.sha1(f"{self.version}:{len(store)}".encode()).hexdigest()[:16]
+
+    # -----------------------------
+    # Search
+    # -----------------------------
+    def options(self, sel_class="All"):
+        return self.store.facets.options(sel_class)
+
+    def normalize(self, q):
+        # Query terms after lowercasing, punctuation and stop-word removal.
+        # Queries with the same terms get the same vector, so this is the cache key.
+        return " ".join(t for t in self.analyzer(q) if " " not in t)
+
+    def row(self, i):
+        return self.store.row(i)
+
+    def search(self, q, topk=5, sel_class="All", sel_chap="All"):
+        return self.search_batch([q], topk=topk, filters=[(sel_class, sel_chap)])[0]
+
+    def search_batch(self, queries, topk=5, filters=None):
+        # Scores a batch of queries; filters[j] is the (class, chapter) filter
+        # of query j. Queries sharing a filter are scored together with one
+        # sparse product against only the selected rows of the question matrix.
+        self._maybe_rebalance()
+        store, idf, blocks = self._state
+        out = [[] for _ in queries]
+        live = [j for j, q in enumerate(queries) if str(q).strip()]
+        if not live or len(store) == 0:
+            return out
+        with span("vectorize"):
+            Q = self._vectorize([queries[j] for j in live], idf)
+        groups = {}
+        for col, j in enumerate(live):
+            groups.setdefault(filters[j] if filters is not None else ("All", "All"), []).append(col)
+        with span("score"):
+            self._score_groups(store, blocks, Q, groups, live, topk, out)
+        return out
+
+    def _score_groups(self, store, blocks, Q, groups, live, topk, out):
+        for (sel_class, sel_chap), cols in groups.items():
+            ids = store.facets.rows(sel_class, sel_chap)
+            if ids is not None and len(ids) == 0:
+                continue
+            rows_all, cols_all, sims_all, offset = [], [], [], 0
+            Qg = Q[cols]
+            for _, X in blocks:
+                n = X.shape[0]
+                if ids is None:
+                    S, local = (X @ Qg[:, :X.shape[1]].T).tocoo(), None
+                else:
+                    local = ids[np.searchsorted(ids, offset):np.searchsorted(ids, offset + n)] - offset
+                    S = (X[local] @ Qg[:, :X.shape[1]].T).tocoo() if len(local) else None
+                if S is not None:
+                    rows_all.append((S.row if local is None else local[S.row]) + offset)
+                    cols_all.append(S.col)
+                    sims_all.append(S.data)
+                offset += n
+            if not rows_all:
+                continue
+            rows_all, cols_all, sims_all = np.concatenate(rows_all), np.concatenate(cols_all), np.concatenate(sims_all)
+            order = np.argsort(cols_all, kind="stable")
+            bounds = np.searchsorted(cols_all[order], np.arange(len(cols) + 1))
+            for g, col in enumerate(cols):
+                sel = order[bounds[g]:bounds[g + 1]]
+                rows, sims = rows_all[sel], sims_all[sel]
+                out[live[col]] = [(float(sims[i]), store.row(rows[i])) for i in topk_desc(sims, topk)]
+
+    # -----------------------------
+    # Access for other engines (qa_lsa)
+    # -----------------------------
+    def _vectorize(self, queries, idf):
+        Q = self._count(queries, grow=False, vocab_size=len(idf))
+        return _l2_normalize(Q @ sp.diags(idf))
+
+    def vectorize(self, queries):
+        # l2-normalized TF-IDF rows of the queries, same columns as matrix().
+        return self._vectorize(queries, self._state[1])
+
+    def matrix(self, start=0):
+        # Weighted rows from row id `start` on, as one CSR matrix over the
+        # current vocabulary.
+        store, idf, blocks = self._state
+        parts, offset = [], 0
+        for _, X in blocks:
+            if offset + X.shape[0] > start:
+                X = sp.csr_matrix((X.data, X.indices, X.indptr), shape=(X.shape[0], len(idf)))
+                parts.append(X[max(start - offset, 0):])
+            offset += X.shape[0]
+        if not parts:
+            return sp.csr_matrix((0, len(idf)), dtype=np.float32)
+        return sp.vstack(parts, format="csr")
+
+    def score_rows(self, Q, rows):
+        # Exact cosine of each query row of Q (from vectorize) with the given
+        # row ids; rows[j] is the id array for query j.
+        blocks = self._state[2]
+        out = []
+        for j, ids in enumerate(rows):
+            ids = np.asarray(ids, dtype=np.int64)
+            sims, offset = np.zeros(len(ids), dtype=np.float32), 0
+            for _, X in blocks:
+                sel = np.flatnonzero((ids >= offset) & (ids < offset + X.shape[0]))
+                if len(sel):
+                    q = Q[j, :X.shape[1]]
+                    sims[sel] = (X[ids[sel] - offset][:, :q.shape[1]] @ q.T).toarray().ravel()
+                offset += X.shape[0]
+            out.append(sims)
+        return out
+
+    def to_csv(self):
+        return self.store.to_csv()
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self, path):
+        # Rebalances into one block, then writes the vocabulary (sorted UTF-8
+        # blob), IDF, CSR matrix and the store into directory `path`. The
+        # directory is written next to `path` and swapped in when complete.
+        with self._lock:
+            self._maybe_rebalance(force=True)
+            store, idf, blocks = self._state
+            tf = blocks[0][0]
+            enc = [t.encode("utf-8") for t in self.vocab.terms()]
+            order = np.array(sorted(range(len(enc)), key=enc.__getitem__), dtype=np.int64)
+            rank = np.empty(len(order), dtype=np.int64)
+            rank[order] = np.arange(len(order))
+            idx = np.int32 if tf.nnz < 2**31 and len(enc) < 2**31 else np.int64
+            tf = sp.csr_matrix((tf.data.copy(), rank[tf.indices].astype(idx), tf.indptr.astype(idx)), shape=tf.shape)
+            tf.sort_indices()
+            X = self._weigh(tf, idf[order])
+            sorted_enc = [enc[i] for i in order]
+            arrays = {
+                "vocab_blob": np.frombuffer(b"".join(sorted_enc), dtype=np.uint8),
+                "vocab_offsets": np.cumsum([0] + [len(b) for b in sorted_enc]).astype(np.int64),
+                "idf": idf[order], "doc_freq": self.doc_freq[order],
+                "indices": tf.indices, "indptr": tf.indptr, "tf": tf.data, "weights": X.data,
+                "answer_keys": self._answer_keys, "keys": self._keys,
+            }
+            tmp = f"{path.rstrip(os.sep)}.tmp-{os.getpid()}"
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(tmp)
+            files = []
+            for name, arr in arrays.items():
+                np.save(os.path.join(tmp, f"{name}.npy"), arr)
+                files.append(f"{name}.npy")
+            store_files, store_meta = store.save(tmp)
+            files += store_files
+            meta = {"format": FORMAT_VERSION, "created": time.time(), "rows": len(store), "terms": len(enc),
+                    "version": self.version, "base_version": self.base_version, "sources": sorted(self.sources),
+                    "store": store_meta, "sizes": {f: os.path.getsize(os.path.join(tmp, f)) for f in files},
+                    "checksums": {f: _sha1_file(os.path.join(tmp, f)) for f in files}}
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            old = f"{path.rstrip(os.sep)}.old-{os.getpid()}"
+            if os.path.exists(path):
+                os.replace(path, old)
+            os.replace(tmp, path)
+            shutil.rmtree(old, ignore_errors=True)
+            return meta
+
+    @classmethod
+    def open(cls, path, base_version=None, verify=False, rebalance_ratio=0.1):
+        # Memory-maps an index written by save(). Raises StaleIndexError when the
+        # format differs, base_version (the dataset_version of the current
+        # built-in bank) doesn't match, a file is missing, can't be read or has
+        # another size than at build time, or a checksum fails, so callers can
+        # fall back to a build. Checksums read every byte of the index, so they
+        # are only checked with verify=True; the other checks cost microseconds.
+        try:
+            return cls._open(path, base_version, verify, rebalance_ratio)
+        except StaleIndexError:
+            raise
+        except (OSError, ValueError, KeyError) as e:
+            raise StaleIndexError(f"{path}: unreadable index ({type(e).__name__}: {e}); rebuild the index") from e
+
+    @classmethod
+    def _open(cls, path, base_version, verify, rebalance_ratio):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if not isinstance(meta, dict):
+            raise StaleIndexError(f"{path}: meta.json is not an index description; rebuild the index")
+        if meta.get("format") != FORMAT_VERSION:
+            raise StaleIndexError(f"{path}: index format {meta.get('format')}, expected {FORMAT_VERSION}")
+        if base_version is not None and meta["base_version"] != base_version:
+            raise StaleIndexError(f"{path}: built from a different built-in bank; rebuild the index")
+        for name, size in meta["sizes"].items():
+            if os.path.getsize(os.path.join(path, name)) != size:
+                raise StaleIndexError(f"{path}: {name} is not the size it was built with; rebuild the index")
+        for name, digest in meta["checksums"].items():
+            if verify and _sha1_file(os.path.join(path, name)) != digest:
+                raise StaleIndexError(f"{path}: checksum mismatch for {name}; rebuild the index")
+        a = {n: np.load(os.path.join(path, f"{n}.npy"), mmap_mode="r")
+             for n in ("vocab_blob", "vocab_offsets", "idf", "doc_freq", "indices", "indptr", "tf", "weights",
+                       "answer_keys", "keys")}
+        store = QuestionStore.open(path, meta["store"])
+        self = cls.__new__(cls)
+        self.analyzer = TfidfVectorizer(ngram_range=(1,2), stop_words="english").build_analyzer()
+        self.rebalance_ratio = rebalance_ratio
+        self.vocab = Vocabulary(a["vocab_blob"], a["vocab_offsets"])
+        self.doc_freq = a["doc_freq"]
+        self.sources = set(meta["sources"])
+        self._lock = threading.RLock()
+        self._answer_keys, self._keys = a["answer_keys"], a["keys"]
+        self._n_weighted = len(store)
+        shape = (len(store), meta["terms"])
+        tf = sp.csr_matrix((a["tf"], a["indices"], a["indptr"]), shape=shape)
+        X = sp.csr_matrix((a["weights"], a["indices"], a["indptr"]), shape=shape)
+        self._state = (store, a["idf"], [(tf, X)])
+        self.version, self.base_version = meta["version"], meta["base_version"]
+        self.weights_version = hashlib.sha1(f"{self.version}:{len(store)}".encode()).hexdigest()[:16]
+        return self
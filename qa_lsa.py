@@ -0,0 +1,303 @@
+# qa_lsa.py — Optional latent-semantic (LSA) retrieval engine.
+# Truncated SVD reduces the question TF-IDF matrix (QAIndex.matrix) to dense
+# float32 vectors, so questions that share few exact terms can still match
+# once the bank has enough co-occurrences. The vectors are grouped into an
+# inverted file: k-means centroids define about sqrt(n) lists and a query scans
+# only the n_probe closest lists, so top-k search is sub-linear. Everything is
+# computed locally with numpy / scikit-learn.
+# mode="lsa" ranks by dense cosine; mode="hybrid" re-ranks the ANN candidates
+# with a blend of dense cosine and the exact TF-IDF cosine (QAIndex.score_rows).
+# LSAIndex.search_batch has QAIndex.search_batch's signature, so either can be
+# the engine of qa_service.BatchingRetriever (app.py: BIO_QA_MODE=lsa|hybrid;
+# qa_service.py: --mode). Recall@k and latency against the exact path on the
+# held-out paraphrases below:
+#   python qa_lsa.py eval --csv extra.csv
+
+import argparse
+import json
+import threading
+import time
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.decomposition import TruncatedSVD
+
+from qa_index import norm_text, topk_desc
+from qa_metrics import span
+
+MODES = ("tfidf", "lsa", "hybrid")
+
+# SVD components when none are given: half the rows, at most MAX_DIM. A
+# near-full-rank SVD of a small bank just reproduces the TF-IDF ranking.
+MAX_DIM = 128
+
+
+def default_dim(n_rows):
+    return max(2, min(MAX_DIM, n_rows // 2))
+
+# Held-out rewordings of built-in questions (paraphrase, answer of the
+# original row); none of them is in the bank.
+PARAPHRASES = [
+    ("organelle that makes ATP", "Mitochondria"),
+    ("Which cell part breaks down worn-out material with digestive enzymes?", "Lysosome"),
+    ("Where are proteins made in a cell?", "Ribosome"),
+    ("Which organelle carries out photosynthesis?", "Chloroplast"),
+    ("What does the Golgi body do?", "Modification, sorting, and packaging of proteins and lipids"),
+    ("Building blocks of proteins?", "Amino acids"),
+    ("How do animals store glucose?", "Glycogen"),
+    ("Main carbohydrate of plant cell walls", "Cellulose"),
+    ("Where does the substrate bind on an enzyme?", "Region where substrate binds and reaction occurs"),
+    ("Cell division giving identical cells", "Mitosis"),
+    ("Division that halves the chromosome number", "Meiosis"),
+    ("When do chromosomes line up in the middle of the cell?", "Metaphase"),
+    ("Who introduced two-part scientific names?", "Carl Linnaeus"),
+    ("Which vessels carry water up a plant?", "Xylem"),
+    ("Which tissue moves sugars through plants?", "Phloem"),
+    ("Evaporation of water from leaves is called?", "Loss of water vapor from aerial parts of plants"),
+    ("Where do the light-independent reactions take place?", "Stroma of chloroplast"),
+    ("Keeping the internal environment constant", "Maintenance of a stable internal environment"),
+    ("Which gland makes insulin?", "Pancreas (beta cells)"),
+    ("Hormone that raises blood sugar", "Glucagon"),
+    ("Cells that carry oxygen", "Red blood cells (erythrocytes)"),
+    ("Which blood cells help blood clot?", "Platelets (thrombocytes)"),
+    ("Air sacs where gases are exchanged", "Alveoli"),
+    ("Basic working unit of the kidney", "Nephron"),
+    ("Part of the brain for coordination and balance", "Cerebellum"),
+    ("Brain region controlling heartbeat and breathing", "Medulla oblongata"),
+    ("Which gland is the master endocrine gland?", "Pituitary gland"),
+    ("Hormone controlling metabolic rate", "Thyroxine (T4)"),
+    ("Fusion of sperm and egg", "Fusion of male and female gametes"),
+    ("Who is known as the founder of genetics?", "Gregor Mendel"),
+    ("Different versions of a gene", "Alternative forms of a gene"),
+    ("Copying DNA into mRNA is called?", "Transcription"),
+    ("Making proteins from mRNA", "Translation"),
+    ("Enzymes that cut DNA at recognition sites", "Restriction endonucleases"),
+    ("Method to copy DNA many times", "Polymerase Chain Reaction (PCR)"),
+    ("Where in the cell does glycolysis happen?", "Cytoplasm"),
+    ("Vitamin made in the skin in sunlight", "Vitamin D"),
+    ("Biggest organ in the human body", "Skin"),
+]
+
+
+def _unit(E):
+    E = np.asarray(E, dtype=np.float32)
+    norms = np.linalg.norm(E, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return E / norms
+
+
+class _IVF:
+    # One build: SVD components, k-means centroids and the row vectors grouped
+    # by list (rows ids[bounds[l]:bounds[l+1]] belong to list l). Rows added
+    # since the build are kept in `extra` (row ids n_base, n_base+1, ...) and
+    # scanned with every query.
+    def __init__(self, components, centroids, vectors, ids, bounds, extra=None):
+        self.components, self.centroids = components, centroids
+        self.vectors, self.ids, self.bounds = vectors, ids, bounds
+        self.n_base = len(ids)
+        self.pos = np.empty(self.n_base, dtype=np.int64)
+        self.pos[ids] = np.arange(self.n_base)
+        self.extra = extra if extra is not None else np.zeros((0, components.shape[0]), dtype=np.float32)
+
+    @property
+    def n_rows(self):
+        return self.n_base + len(self.extra)
+
+    @property
+    def list_size(self):
+        return self.n_base / max(len(self.centroids), 1)
+
+    def embed(self, X, step=50_000):
+        # Unit dense vectors of TF-IDF rows (a CSR matrix over >= the fitted vocabulary).
+        V = self.components.shape[1]
+        parts = [_unit(X[lo:lo + step, :V] @ self.components.T) for lo in range(0, X.shape[0], step)]
+        return np.vstack(parts) if parts else np.zeros((0, self.components.shape[0]), dtype=np.float32)
+
+    def fold_in(self, X):
+        new = _IVF.__new__(_IVF)
+        new.__dict__.update(self.__dict__)
+        new.extra = np.vstack([self.extra, self.embed(X)])
+        return new
+
+    def vectors_for(self, ids):
+        out = np.empty((len(ids), self.components.shape[0]), dtype=np.float32)
+        base = ids < self.n_base
+        out[base] = self.vectors[self.pos[ids[base]]]
+        out[~base] = self.extra[ids[~base] - self.n_base]
+        return out
+
+    def probe(self, qe, n_probe):
+        # Candidate row ids and dense cosines from the n_probe closest lists.
+        lists = topk_desc(self.centroids @ qe, n_probe)
+        spans = [np.arange(self.bounds[l], self.bounds[l + 1]) for l in lists]
+        pos = np.concatenate(spans) if spans else np.zeros(0, dtype=np.int64)
+        ids = np.concatenate([self.ids[pos], np.arange(self.n_base, self.n_rows)])
+        sims = np.concatenate([self.vectors[pos] @ qe, self.extra @ qe])
+        return ids, sims
+
+
+class LSAIndex:
+    # Dense engine over a QAIndex. The SVD and k-means are fitted on at most
+    # fit_rows sampled rows; all rows are then projected in chunks. Rows added
+    # to the index later are folded in with the same components, and the
+    # model is refitted once the bank has grown by rebuild_ratio. dim=None
+    # picks default_dim() of the bank size at each (re)fit.
+    def __init__(self, index, mode="hybrid", dim=None, n_probe=8, rerank=10, alpha=0.5,
+                 rebuild_ratio=0.5, fit_rows=200_000, seed=0):
+        if mode not in ("lsa", "hybrid"):
+            raise ValueError(f"mode must be 'lsa' or 'hybrid', not {mode!r}")
+        self.index = index
+        self.mode = mode
+        self.dim, self.n_probe, self.rerank, self.alpha = dim, n_probe, rerank, alpha
+        self.rebuild_ratio, self.fit_rows, self.seed = rebuild_ratio, fit_rows, seed
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._ivf = self._build()
+
+    def __len__(self):
+        return len(self.index)
+
+    def fork(self, index):
+        # Same model over `index` (a QAIndex.fork() of self.index); its
+        # fold-ins and refits don't touch this engine.
+        new = LSAIndex.__new__(LSAIndex)
+        new.__dict__.update(self.__dict__)
+        new.index, new._lock = index, threading.Lock()
+        return new
+
+    @property
+    def weights_version(self):
+        # Result-cache key part; changes when the model is refitted.
+        return f"{self.mode}:{self.generation}:{self.index.weights_version}"
+
+    def _build(self):
+        X = self.index.matrix()
+        n, V = X.shape
+        if n < 2 or V < 2:
+            raise ValueError("LSA needs at least two rows and two terms")
+        rng = np.random.default_rng(self.seed)
+        sample = np.sort(rng.choice(n, self.fit_rows, replace=False)) if n > self.fit_rows else np.arange(n)
+        dim = self.dim or default_dim(n)
+        svd = TruncatedSVD(n_components=max(1, min(dim, len(sample) - 1, V - 1)),
+                           algorithm="randomized", random_state=self.seed)
+        svd.fit(X[sample])
+        ivf = _IVF(svd.components_.astype(np.float32), None, None, np.zeros(0, dtype=np.int64), None)
+        E = ivf.embed(X)
+        km = MiniBatchKMeans(n_clusters=max(1, int(np.sqrt(n))), n_init=3, batch_size=4096,
+                             random_state=self.seed).fit(E[sample])
+        labels = km.predict(E)
+        ids = np.argsort(labels, kind="stable")
+        bounds = np.searchsorted(labels[ids], np.arange(km.n_clusters + 1))
+        return _IVF(ivf.components, _unit(km.cluster_centers_), E[ids], ids, bounds)
+
+    def _refresh(self):
+        ivf, n = self._ivf, len(self.index)
+        if n == ivf.n_rows:
+            return ivf
+        with self._lock:
+            ivf = self._ivf
+            if n > ivf.n_base * (1 + self.rebuild_ratio):
+                self._ivf = self._build()
+                self.generation += 1
+            elif n > ivf.n_rows:
+                self._ivf = ivf.fold_in(self.index.matrix(ivf.n_rows))
+            return self._ivf
+
+    def search(self, q, topk=5, sel_class="All", sel_chap="All"):
+        return self.search_batch([q], topk=topk, filters=[(sel_class, sel_chap)])[0]
+
+    def search_batch(self, queries, topk=5, filters=None):
+        # Same contract as QAIndex.search_batch. A filter small enough to be
+        # cheaper than probing is scanned exhaustively.
+        store, ivf = self.index.store, self._refresh()
+        out = [[] for _ in queries]
+        live = [j for j, q in enumerate(queries) if str(q).strip()]
+        if not live:
+            return out
+        with span("vectorize"):
+            Q = self.index.vectorize([queries[j] for j in live])
+            E = ivf.embed(Q)
+        with span("score"):
+            self._score(store, ivf, Q, E, live, topk, filters, out)
+        return out
+
+    def _score(self, store, ivf, Q, E, live, topk, filters, out):
+        n_cand = topk * self.rerank if self.mode == "hybrid" else topk
+        for col, j in enumerate(live):
+            allowed = store.facets.rows(*(filters[j] if filters is not None else ("All", "All")))
+            if allowed is not None:
+                allowed = allowed[allowed < ivf.n_rows]
+            ids = None
+            if allowed is None or len(allowed) > self.n_probe * ivf.list_size:
+                ids, sims = ivf.probe(E[col], self.n_probe)
+                if allowed is not None:
+                    keep = np.isin(ids, allowed)
+                    ids, sims = ids[keep], sims[keep]
+                    if len(ids) < n_cand:
+                        ids = None
+            if ids is None:
+                ids = np.asarray(allowed, dtype=np.int64)
+                sims = ivf.vectors_for(ids) @ E[col]
+            if len(ids) == 0:
+                continue
+            best = topk_desc(sims, n_cand)
+            ids, sims = ids[best], sims[best]
+            if self.mode == "hybrid":
+                sims = self.alpha * self.index.score_rows(Q[col], [ids])[0] + (1 - self.alpha) * sims
+                best = topk_desc(sims, topk)
+                ids, sims = ids[best], sims[best]
+            out[j] = [(float(s), store.row(i)) for i, s in zip(ids, sims)]
+
+
+# -----------------------------
+# Evaluation
+# -----------------------------
+def evaluate(engine, topk=5, repeat=5, paraphrases=PARAPHRASES):
+    # Paraphrase recall@1 / recall@topk (a hit is a result with the original
+    # row's answer) and per-query latency in milliseconds.
+    hits1 = hitsk = 0
+    times = []
+    for q, answer in paraphrases:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            res = engine.search_batch([q], topk=topk)[0]
+            times.append((time.perf_counter() - start) * 1000)
+        found = [norm_text(r["answer"]) == norm_text(answer) for _, r in res]
+        hits1 += bool(found[:1] and found[0])
+        hitsk += any(found)
+    n = len(paraphrases)
+    return {"recall@1": round(hits1 / n, 3), f"recall@{topk}": round(hitsk / n, 3),
+            "p50_ms": round(float(np.percentile(times, 50)), 3), "p99_ms": round(float(np.percentile(times, 99)), 3)}
+
+
+def main(argv=None):
+    from qa_service import load_bank
+
+    ap = argparse.ArgumentParser(description="LSA retrieval engine for the Biology Q/A bank")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ev = sub.add_parser("eval", help="compare recall@k and latency of tfidf / lsa / hybrid on held-out paraphrases")
+    ev.add_argument("--csv", nargs="*", default=[], help="extra MCQ CSVs to merge")
+    ev.add_argument("--index", help="saved index directory to memory-map")
+    ev.add_argument("--topk", type=int, default=5)
+    ev.add_argument("--dim", type=int, help="SVD components (default: half the rows, at most 128)")
+    ev.add_argument("--n-probe", type=int, default=8, help="k-means lists scanned per query")
+    ev.add_argument("--repeat", type=int, default=5, help="timed runs per query")
+    ev.add_argument("--json", help="also write the results to this file")
+    args = ap.parse_args(argv)
+
+    index = load_bank(args.csv, args.index)
+    results = {"rows": len(index), "queries": len(PARAPHRASES), "topk": args.topk, "modes": {}}
+    for mode in MODES:
+        start = time.perf_counter()
+        engine = index if mode == "tfidf" else LSAIndex(index, mode=mode, dim=args.dim, n_probe=args.n_probe)
+        build = time.perf_counter() - start
+        results["modes"][mode] = dict(evaluate(engine, args.topk, args.repeat), build_s=round(build, 3))
+    print(f"{results['rows']} rows, {results['queries']} held-out paraphrases, top-{args.topk}")
+    for mode, r in results["modes"].items():
+        print(f"  {mode:7s} " + "  ".join(f"{k} {v}" for k, v in r.items()))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+# qa_metrics.py — Timing spans, a metrics registry and a slow-query log.
+# span("stage") times one stage of a script run or request and records it in
+# the bio_qa_stage_seconds histogram; inside a trace the stage times are also
+# summed per run, and a run slower than the threshold is written to the slow-
+# query log with its query, filter, corpus size, per-stage breakdown and the
+# exception that ended it, if any.
+# REGISTRY.prometheus() renders every metric in Prometheus text format and
+# REGISTRY.dump(path) writes it to a file.
+# Off by default: span() then returns a shared no-op context and traces are
+# None, so instrumented code pays one flag check per stage. Settings:
+#   BIO_QA_METRICS=1           enable instrumentation
+#   BIO_QA_SLOW_MS=500         slow-query threshold (milliseconds)
+#   BIO_QA_SLOW_LOG=slow.jsonl append slow queries to this file (JSON lines)
+#   BIO_QA_METRICS_FILE=m.prom dump the registry here after each traced run
+
+import bisect
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_enabled = os.environ.get("BIO_QA_METRICS", "0").lower() not in ("", "0", "false", "no", "off")
+_metrics_file = os.environ.get("BIO_QA_METRICS_FILE") or None
+_local = threading.local()
+_NOOP = contextlib.nullcontext()
+
+
+def _fmt_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                    for k, v in labels)
+    return "{" + body + "}"
+
+
+def _num(v):
+    return repr(float(v)) if v != int(v) else str(int(v))
+
+
+class Registry:
+    # Counters, gauges and histograms keyed by name and sorted label pairs.
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._meta = {}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, kind, help_text):
+        self._meta[name] = (kind, help_text)
+
+    def inc(self, name, value=1.0, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = float(value)
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._values.get(key)
+            if hist is None:
+                hist = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            hist[0][bisect.bisect_left(self.buckets, value)] += 1
+            hist[1] += value
+            hist[2] += 1
+
+    def snapshot(self):
+        # {name: [(labels dict, value or {"buckets", "sum", "count"}), ...]}
+        with self._lock:
+            items = [(k, [list(v[0]), v[1], v[2]] if isinstance(v, list) else v) for k, v in self._values.items()]
+        out = {}
+        for (name, labels), v in sorted(items):
+            if isinstance(v, list):
+                v = {"buckets": dict(zip([str(b) for b in self.buckets] + ["+Inf"], v[0])), "sum": v[1], "count": v[2]}
+            out.setdefault(name, []).append((dict(labels), v))
+        return out
+
+    def prometheus(self):
+        lines = []
+        for name, series in self.snapshot().items():
+            kind, help_text = self._meta.get(name, ("untyped", ""))
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for labels, v in series:
+                pairs = sorted(labels.items())
+                if isinstance(v, dict):
+                    total = 0
+                    for le, n in v["buckets"].items():
+                        total += n
+                        lines.append(f"{name}_bucket{_fmt_labels(pairs + [('le', le)])} {total}")
+                    lines.append(f"{name}_sum{_fmt_labels(pairs)} {_num(v['sum'])}")
+                    lines.append(f"{name}_count{_fmt_labels(pairs)} {v['count']}")
+                else:
+                    lines.append(f"{name}{_fmt_labels(pairs)} {_num(v)}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        # Writes the Prometheus text next to `path` and swaps it in.
+        tmp = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+
+class SlowQueryLog:
+    # Keeps the most recent slow runs in memory and optionally appends each
+    # one to a JSON-lines file.
+    def __init__(self, threshold_ms=500.0, path=None, maxlen=100):
+        self.threshold_ms = threshold_ms
+        self.path = path
+        self.entries = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+
+    def record(self, entry):
+        with self._lock:
+            self.entries.append(entry)
+            if self.path:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+
+    def recent(self):
+        with self._lock:
+            return list(self.entries)
+
+
+REGISTRY = Registry()
+REGISTRY.describe("bio_qa_stage_seconds", "histogram", "Time spent per stage of a script run or request.")
+REGISTRY.describe("bio_qa_runs_total", "counter", "Traced script runs and requests.")
+REGISTRY.describe("bio_qa_slow_queries_total", "counter", "Runs slower than the slow-query threshold.")
+REGISTRY.describe("bio_qa_cache_lookups_total", "counter", "Result-cache lookups by outcome.")
+REGISTRY.describe("bio_qa_rows", "gauge", "Rows in the Q/A bank at the last traced run.")
+SLOW_LOG = SlowQueryLog(float(os.environ.get("BIO_QA_SLOW_MS", 500)), os.environ.get("BIO_QA_SLOW_LOG") or None)
+
+
+def configure(enabled=None, slow_ms=None, slow_log=None, metrics_file=None):
+    # Overrides the environment settings (qa_service.py serve flags).
+    global _enabled, _metrics_file
+    if enabled is not None:
+        _enabled = bool(enabled)
+    if slow_ms is not None:
+        SLOW_LOG.threshold_ms = float(slow_ms)
+    if slow_log is not None:
+        SLOW_LOG.path = slow_log
+    if metrics_file is not None:
+        _metrics_file = metrics_file
+
+
+def enabled():
+    return _enabled
+
+
+def inc(name, value=1.0, **labels):
+    if _enabled:
+        REGISTRY.inc(name, value, **labels)
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.stage, time.perf_counter() - self.start)
+
+
+def span(stage):
+    return _Span(stage) if _enabled else _NOOP
+
+
+def record(stage, seconds):
+    # Adds one stage timing to the histogram and to this thread's trace.
+    REGISTRY.observe("bio_qa_stage_seconds", seconds, stage=stage)
+    merge({stage: seconds})
+
+
+def merge(stages):
+    # Adds stage timings measured elsewhere (e.g. a batch worker thread) to
+    # this thread's trace, without recording them in the histogram again.
+    stack = getattr(_local, "stack", None)
+    if stack and stages:
+        current = stack[-1]
+        for stage, seconds in stages.items():
+            current[stage] = current.get(stage, 0.0) + seconds
+
+
+def collect():
+    # Starts collecting this thread's stage timings; returns the dict that
+    # fills up until end_collect(), or None when instrumentation is off.
+    if not _enabled:
+        return None
+    stages = {}
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    _local.stack.append(stages)
+    return stages
+
+
+def end_collect(stages):
+    if stages is not None and getattr(_local, "stack", None) and _local.stack[-1] is stages:
+        _local.stack.pop()
+
+
+class Trace:
+    def __init__(self, kind):
+        self.kind = kind
+        self.start = time.perf_counter()
+        self.stages = collect()
+
+
+def start_trace(kind="script"):
+    return Trace(kind) if _enabled else None
+
+
+def finish_trace(trace, query=None, filter=None, rows=None, error=None):
+    # Records the run's total time; a run above the threshold goes to the
+    # slow-query log. `error` is the exception class that ended the run, if
+    # any (e.g. Streamlit stopping a script for a rerun). No-op for a None trace.
+    if trace is None:
+        return
+    total = time.perf_counter() - trace.start
+    end_collect(trace.stages)
+    REGISTRY.observe("bio_qa_stage_seconds", total, stage=trace.kind)
+    REGISTRY.inc("bio_qa_runs_total", kind=trace.kind)
+    if rows is not None:
+        REGISTRY.set("bio_qa_rows", rows)
+    if total * 1000 >= SLOW_LOG.threshold_ms:
+        REGISTRY.inc("bio_qa_slow_queries_total", kind=trace.kind)
+        SLOW_LOG.record({"time": time.time(), "kind": trace.kind, "total_ms": round(total * 1000, 3),
+                         "query": query, "filter": list(filter) if filter is not None else None, "rows": rows,
+                         "error": error.__name__ if error is not None else None, "stages_ms": {k: round(v * 1000, 3) for k, v in trace.stages.items()}})
+    if _metrics_file:
+        REGISTRY.dump(_metrics_file)
+
+
+@contextlib.contextmanager
+def trace(kind, query=None, filter=None, rows=None):
+    t = start_trace(kind)
+    error = None
+    try:
+        yield t
+    except BaseException as e:
+        error = type(e)
+        raise
+    finally:
+        finish_trace(t, query=query, filter=filter, rows=rows, error=error)
@@ -0,0 +1,105 @@
+# qa_quiz.py — Question sampling for the quiz in app1.py.
+# Pools are the per-(class, chapter) row-id arrays of the shared store's
+# FacetIndex, so nothing is filtered or copied per click. Each pool is drawn
+# without replacement by a lazy Fisher-Yates shuffle: a draw is O(1) and only
+# the positions already swapped are remembered. A Quiz lives in session state
+# and draws across several chapters, optionally favouring weak chapters
+# (more "wrong" than "right" marks).
+
+import random
+
+
+class ShuffledPool:
+    # Yields positions 0..n-1 in random order, each once per round.
+    def __init__(self, n, rng):
+        self.n = self.remaining = n
+        self.rng = rng
+        self._swaps = {}
+
+    def draw(self):
+        # Next position; the pool must not be exhausted. Drawn positions end
+        # up in slots remaining..n-1, as in an in-place Fisher-Yates shuffle.
+        j = self.rng.randrange(self.remaining)
+        last = self.remaining - 1
+        pos = self._swaps.get(j, j)
+        self._swaps[j] = self._swaps.get(last, last)
+        self._swaps[last] = pos
+        self.remaining = last
+        return pos
+
+    def grow(self, n):
+        # Rows appended to the chapter (an upload) join the current round.
+        for pos in range(self.n, n):
+            slot = self.remaining
+            self._swaps[pos] = self._swaps.get(slot, slot)
+            self._swaps[slot] = pos
+            self.remaining += 1
+        self.n = max(self.n, n)
+
+    def reset(self):
+        self.remaining = self.n
+        self._swaps = {}
+
+
+class Quiz:
+    def __init__(self, seed=None):
+        self.rng = random.Random(seed)
+        self.pools = {}
+        self.score = {}
+        self.current = None
+        self.revealed = False
+
+    def weakness(self, key):
+        right, wrong = self.score.get(key, (0, 0))
+        return (wrong + 1) / (right + 1)
+
+    def progress(self, facets, keys):
+        # (seen, total) questions of the current round over the chapters `keys`.
+        # Rows appended since a pool was made are unseen; draw() adds them.
+        total = left = 0
+        for k in keys:
+            n = len(facets.groups.get(("pair", k), ()))
+            pool = self.pools.get(k)
+            total += n
+            left += n if pool is None else pool.remaining + max(0, n - pool.n)
+        return total - left, total
+
+    def draw(self, facets, keys, weighted=False):
+        # Draws a row id from the (class, chapter) pairs `keys`. Unweighted,
+        # a round covers every question of the chapters once, so a chapter is
+        # picked in proportion to its unseen questions. Weighted, a chapter is
+        # picked in proportion to its size times its weakness and restarts on
+        # its own when used up, so weak chapters come up more often without
+        # repeats inside a chapter. Returns (row id, new round started), or
+        # (None, False) when the chapters are empty.
+        ids = {k: facets.groups.get(("pair", k), ()) for k in keys}
+        for k, rows in ids.items():
+            pool = self.pools.setdefault(k, ShuffledPool(len(rows), self.rng))
+            if len(rows) > pool.n:
+                pool.grow(len(rows))
+        live = [k for k in keys if self.pools[k].n]
+        if not live:
+            return None, False
+        if weighted:
+            weights = [self.pools[k].n * self.weakness(k) for k in live]
+            key = self.rng.choices(live, weights)[0]
+            new_round = not self.pools[key].remaining
+            if new_round:
+                self.pools[key].reset()
+        else:
+            new_round = not any(self.pools[k].remaining for k in live)
+            if new_round:
+                for k in live:
+                    self.pools[k].reset()
+            key = self.rng.choices(live, [self.pools[k].remaining for k in live])[0]
+        row_id = int(ids[key][self.pools[key].draw()])
+        self.current, self.revealed = (row_id, key), False
+        return row_id, new_round
+
+    def record(self, correct):
+        # Marks the current question right or wrong for weak-chapter weighting.
+        if self.current is None:
+            return
+        key = self.current[1]
+        right, wrong = self.score.get(key, (0, 0))
+        self.score[key] = (right + 1, wrong) if correct else (right, wrong + 1)
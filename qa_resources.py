@@ -0,0 +1,77 @@
+# qa_resources.py — Streamlit resources for app.py and app1.py.
+# st.cache_resource builds each loader once per `streamlit run` process and
+# shares it between that process's sessions. app.py and app1.py are separate
+# apps, so each holds its own copy; with BIO_QA_INDEX pointing at a saved
+# index both memory-map the same files and the OS shares those pages.
+# app1.py only needs the question store (load_store). The search stack
+# (scikit-learn, the TF-IDF index, the batching worker) is imported inside
+# the loaders that use it, so the quiz never loads it.
+
+import json
+import os
+import pandas as pd
+import streamlit as st
+
+from mcqs import MCQS
+from qa_store import COLUMNS, QuestionStore, dataset_version
+
+base = QuestionStore.from_frame(pd.DataFrame(MCQS, columns=COLUMNS))
+
+# app.py merges an uploaded file into a private fork of the index for that
+# session, or with BIO_QA_SHARED_UPLOADS=1 into the index every session
+# shares. With BIO_QA_SERVICE_URL the service holds the only index, so
+# uploads are always shared there.
+SHARED_UPLOADS = (os.environ.get("BIO_QA_SHARED_UPLOADS", "0") == "1"
+                  or bool(os.environ.get("BIO_QA_SERVICE_URL")))
+
+
+# The question store alone: the store of the saved index (memory-mapped) when
+# BIO_QA_INDEX is set and was built from this bank, else the built-in bank.
+@st.cache_resource(show_spinner=False)
+def load_store():
+    path = os.environ.get("BIO_QA_INDEX")
+    if path and os.path.isdir(path):
+        try:
+            with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["base_version"] == dataset_version(base):
+                return QuestionStore.open(path, meta["store"])
+            st.warning(f"{path}: built from a different question bank. Using the built-in questions.")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            st.warning(f"{path}: {e}. Using the built-in questions.")
+    return base
+
+
+# One live index for the built-in bank, shared by all sessions and reruns
+# (sessions fork it for their own uploads).
+# With BIO_QA_INDEX set, a saved index (python qa_service.py build) is
+# memory-mapped instead of rebuilt; BIO_QA_INDEX_VERIFY=1 also checks its
+# checksums, which reads the whole index on every start.
+@st.cache_resource(show_spinner="Building search index...")
+def load_index():
+    from qa_index import QAIndex, StaleIndexError
+
+    path = os.environ.get("BIO_QA_INDEX")
+    if path and os.path.isdir(path):
+        try:
+            return QAIndex.open(path, base_version=dataset_version(base),
+                                verify=os.environ.get("BIO_QA_INDEX_VERIFY", "0") == "1")
+        except StaleIndexError as e:
+            st.warning(f"{e}. Building the index in-process instead.")
+    return QAIndex(base)
+
+
+# Sessions share one batching worker, so concurrent questions are scored
+# together instead of one vectorize-and-score pass per session.
+@st.cache_resource(show_spinner=False)
+def load_retriever():
+    from qa_cache import QueryCache
+    from qa_service import BatchingRetriever, HTTPRetriever, make_engine
+
+    url = os.environ.get("BIO_QA_SERVICE_URL")
+    if url:
+        return HTTPRetriever(url)
+    index = load_index()
+    return BatchingRetriever(index, window_ms=float(os.environ.get("BIO_QA_BATCH_WINDOW_MS", 5)),
+                             cache=QueryCache(), engine=make_engine(index, os.environ.get("BIO_QA_MODE", "tfidf"),
+                                                                    int(os.environ.get("BIO_QA_LSA_DIM", 0)) or None))
@@ -0,0 +1,384 @@
+# qa_service.py — Headless retrieval service for the Biology Q/A bank.
+# One process owns the index; questions that arrive within a short window are
+# scored together with a single sparse matrix product (QAIndex.search_batch).
+# How to run:
+#   python qa_service.py serve --port 8765 --window-ms 5 --max-batch 64
+#   python qa_service.py ask "Where does glycolysis occur?"
+#   python qa_service.py ask --url http://127.0.0.1:8765 "Define homeostasis."
+#   python qa_service.py build --out bio_index --csv extra.csv   (then serve/ask --index bio_index)
+#   python qa_service.py serve --mode hybrid   (LSA engine, see qa_lsa.py)
+#   python qa_service.py serve --metrics --slow-ms 200 --slow-log slow.jsonl   (GET /metrics)
+# app.py uses the in-process worker unless BIO_QA_SERVICE_URL is set.
+
+import argparse
+import json
+import queue
+import threading
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from qa_cache import CACHE_SIZE, CACHE_TTL, QueryCache
+from qa_index import QAIndex, StaleIndexError, dataset_version
+from qa_lsa import MODES, LSAIndex
+from qa_metrics import REGISTRY, SLOW_LOG, collect, configure, end_collect, inc, merge, record, trace
+from qa_store import COLUMNS, IngestStats, QuestionStore, file_sha1, read_mcq_csv
+
+DEFAULT_PORT = 8765
+
+
+def _jsonable(results):
+    return [{"score": sc, **{c: str(v) for c, v in row.items()}} for sc, row in results]
+
+
+class BatchingRetriever:
+    # window_ms is the latency/throughput knob: a request waits at most that
+    # long for company before its batch is scored. workers > 1 drains the
+    # queue from several threads, so batches are scored in parallel.
+    # Repeated questions are answered from `cache` without being queued.
+    # `engine` scores the batches (default: the exact TF-IDF index itself).
+    # workers=0 scores each question in the calling thread instead.
+    def __init__(self, index, window_ms=5, max_batch=64, workers=1, cache=None, engine=None):
+        self.index = index
+        self.engine = engine if engine is not None else index
+        self.cache = cache if cache is not None else QueryCache(0)
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._threads = [threading.Thread(target=self._run, daemon=True, name=f"qa-batch-{i}") for i in range(workers)]
+        for t in self._threads:
+            t.start()
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def version(self):
+        return self.index.version
+
+    def fork(self):
+        # Retriever over a private fork of the index, for one session's
+        # uploads (app.py). It scores in the caller's thread and has no cache;
+        # the shared retriever and its cache are left as they are.
+        index = self.index.fork()
+        engine = self.engine.fork(index) if self.engine is not self.index else None
+        return BatchingRetriever(index, workers=0, engine=engine)
+
+    def add_rows(self, data, source=None):
+        res = self.index.add_rows(data, source=source)
+        res["invalidated"] = self.cache.invalidate(res.pop("changes"))
+        return res
+
+    def to_csv(self):
+        return self.index.to_csv()
+
+    def stats(self):
+        return {"rows": len(self.index), "version": self.index.version, "cache": self.cache.stats()}
+
+    def options(self, sel_class="All"):
+        return self.index.options(sel_class)
+
+    def search(self, q, topk=5, sel_class="All", sel_chap="All", timeout=30):
+        key = (self.engine.weights_version, self.index.normalize(q), str(sel_class), str(sel_chap), topk)
+        results = self.cache.get(key)
+        inc("bio_qa_cache_lookups_total", result="miss" if results is None else "hit")
+        if results is not None:
+            return results
+        epoch = self.cache.epoch
+        if not self._threads:
+            results = self.engine.search_batch([q], topk=topk, filters=[(sel_class, sel_chap)])[0]
+            self.cache.put(key, set(self.index.analyzer(q)), results, epoch)
+            return results
+        fut = Future()
+        fut.queued, fut.stages = time.perf_counter(), None
+        self._queue.put((q, topk, sel_class, sel_chap, fut))
+        results = fut.result(timeout=timeout)
+        # Stage times of the batch that answered this question (worker thread).
+        merge(fut.stages)
+        self.cache.put(key, set(self.index.analyzer(q)), results, epoch)
+        return results
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            stages = collect()
+            try:
+                if stages is not None:
+                    record("queue_wait", time.perf_counter() - min(fut.queued for *_, fut in batch))
+                topk = max(k for _, k, _, _, _ in batch)
+                results = self.engine.search_batch([q for q, _, _, _, _ in batch], topk=topk,
+                                                  filters=[(c, ch) for _, _, c, ch, _ in batch])
+                end_collect(stages)
+                for (_, k, _, _, fut), res in zip(batch, results):
+                    fut.stages = stages
+                    fut.set_result(res[:k])
+            except Exception as e:
+                end_collect(stages)
+                for *_, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+
+class HTTPRetriever:
+    # Client with the same search() signature as BatchingRetriever.
+    def __init__(self, url, timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _call(self, path, payload=None):
+        data = None if payload is None else json.dumps(payload).encode()
+        req = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            body = resp.read()
+        return body if path == "/export" else json.loads(body)
+
+    def __len__(self):
+        return self._call("/health")["rows"]
+
+    @property
+    def version(self):
+        return self._call("/health")["version"]
+
+    def add_rows(self, data, source=None):
+        # Posts one request per chunk; chunk k is applied once as "<source>:<k>".
+        total = {"added": 0, "exact_dups": 0, "near_dups": 0, "skipped": True}
+        for k, chunk in enumerate([data] if isinstance(data, pd.DataFrame) else data):
+            rows = chunk[COLUMNS].astype(str).to_dict(orient="records")
+            res = self._call("/rows", {"rows": rows, "source": None if source is None else f"{source}:{k}"})
+            for key in ("added", "exact_dups", "near_dups"):
+                total[key] += res[key]
+            total["skipped"] &= res["skipped"]
+        return total
+
+    def to_csv(self):
+        return self._call("/export").decode()
+
+    def options(self, sel_class="All"):
+        return self._call("/options?" + urllib.parse.urlencode({"class": sel_class}))
+
+    def stats(self):
+        return self._call("/stats")
+
+    def search(self, q, topk=5, sel_class="All", sel_chap="All"):
+        payload = self._call("/search", {"q": q, "topk": topk, "class": sel_class, "chapter": sel_chap})
+        return [(r.pop("score"), r) for r in payload["results"]]
+
+
+class QAServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+def _search_request(req):
+    # (q, topk, (class, chapter)) from a /search body; ValueError if malformed.
+    if not isinstance(req, dict):
+        raise ValueError("request body must be a JSON object")
+    q = req.get("q")
+    if not isinstance(q, str):
+        raise ValueError("q must be a string")
+    topk = req.get("topk", 5)
+    if isinstance(topk, bool) or not isinstance(topk, int) or topk < 1:
+        raise ValueError("topk must be an integer of at least 1")
+    sel = (req.get("class", "All"), req.get("chapter", "All"))
+    if not all(isinstance(v, str) for v in sel):
+        raise ValueError("class and chapter must be strings")
+    return q, topk, sel
+
+
+def _rows_request(req):
+    # (DataFrame, source) from a /rows body; ValueError if malformed.
+    if not isinstance(req, dict):
+        raise ValueError("request body must be a JSON object")
+    rows, source = req.get("rows"), req.get("source")
+    if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+        raise ValueError("rows must be a list of objects")
+    if source is not None and not isinstance(source, str):
+        raise ValueError("source must be a string")
+    return pd.DataFrame(rows, columns=COLUMNS), source
+
+
+def make_handler(retriever):
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, code, payload, content_type="application/json"):
+            data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urllib.parse.urlparse(self.path)
+            if url.path == "/health":
+                self._send(200, {"status": "ok", "rows": len(retriever), "version": retriever.version})
+            elif url.path == "/options":
+                self._send(200, retriever.options(urllib.parse.parse_qs(url.query).get("class", ["All"])[0]))
+            elif url.path == "/stats":
+                self._send(200, retriever.stats())
+            elif url.path == "/export":
+                self._send(200, retriever.to_csv().encode(), content_type="text/csv")
+            elif url.path == "/metrics":
+                self._send(200, REGISTRY.prometheus().encode(), content_type="text/plain; version=0.0.4")
+            elif url.path == "/slow":
+                self._send(200, {"threshold_ms": SLOW_LOG.threshold_ms, "entries": SLOW_LOG.recent()})
+            else:
+                self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path not in ("/search", "/rows"):
+                self._send(404, {"error": "not found"})
+                return
+            try:
+                req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if self.path == "/rows":
+                    rows, source = _rows_request(req)
+                    res = retriever.add_rows(rows, source=source)
+                else:
+                    q, topk, sel = _search_request(req)
+                    with trace("request", query=q, filter=sel, rows=len(retriever)):
+                        res = {"results": _jsonable(retriever.search(
+                            q, topk=topk, sel_class=sel[0], sel_chap=sel[1]))}
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+                return
+            except Exception as e:  # e.g. a search that timed out in the batch queue
+                self._send(500, {"error": f"{type(e).__name__}: {e}"})
+                return
+            self._send(200, res)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    return Handler
+
+
+def make_engine(index, mode="tfidf", dim=None):
+    # None for the exact TF-IDF path; an LSAIndex for "lsa" / "hybrid".
+    # dim=None sizes the SVD to the bank (qa_lsa.default_dim).
+    return None if mode == "tfidf" else LSAIndex(index, mode=mode, dim=dim)
+
+
+def load_bank(csv_paths=(), index_path=None, verify=False):
+    # Built-in bank (or a saved index built from it) plus extra CSVs, merged
+    # incrementally like uploads in app.py.
+    from mcqs import MCQS
+    base = QuestionStore.from_frame(pd.DataFrame(MCQS, columns=COLUMNS))
+    if index_path:
+        try:
+            index = QAIndex.open(index_path, base_version=dataset_version(base), verify=verify)
+        except StaleIndexError as e:
+            raise SystemExit(str(e))
+    else:
+        index = QAIndex(base)
+    for path in csv_paths:
+        stats = IngestStats()
+        with open(path, "rb") as f:
+            source = file_sha1(f)
+            try:
+                res = index.add_rows(read_mcq_csv(f, stats=stats), source=source)
+            except ValueError as e:
+                raise SystemExit(f"{path}: {e}")
+        print(f"{path}: already in the index" if res["skipped"] else f"Loaded {path}: {stats}")
+    return index
+
+
+def _positive_int(value):
+    n = int(value)
+    if n < 1:
+        raise argparse.ArgumentTypeError("must be at least 1")
+    return n
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Biology Q/A retrieval service")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sp = sub.add_parser("serve", help="run the HTTP retrieval service")
+    sp.add_argument("--host", default="127.0.0.1")
+    sp.add_argument("--port", type=int, default=DEFAULT_PORT)
+    sp.add_argument("--window-ms", type=float, default=5.0, help="batching window (latency vs throughput)")
+    sp.add_argument("--max-batch", type=int, default=64)
+    sp.add_argument("--workers", type=int, default=1)
+    sp.add_argument("--csv", nargs="*", default=[], help="extra MCQ CSVs to merge")
+    sp.add_argument("--cache-size", type=int, default=CACHE_SIZE, help="cached results (0 disables)")
+    sp.add_argument("--cache-ttl", type=float, default=CACHE_TTL, help="seconds a cached result stays valid")
+    sp.add_argument("--index", help="saved index directory to memory-map (see build)")
+    sp.add_argument("--verify", action="store_true", help="also check the SHA-1 checksums of --index (reads it all)")
+    sp.add_argument("--mode", choices=MODES, default="tfidf", help="retrieval engine")
+    sp.add_argument("--lsa-dim", type=_positive_int, help="SVD components for --mode lsa/hybrid")
+    sp.add_argument("--metrics", action="store_true", help="time each stage (GET /metrics, /slow)")
+    sp.add_argument("--slow-ms", type=float, help="slow-query threshold in milliseconds")
+    sp.add_argument("--slow-log", help="append slow queries to this JSON-lines file")
+    sp.add_argument("--metrics-file", help="dump the metrics here after each request and at exit")
+    bp = sub.add_parser("build", help="write a saved index for fast, shared start-up")
+    bp.add_argument("--out", required=True, help="output directory (replaced atomically)")
+    bp.add_argument("--csv", nargs="*", default=[], help="extra MCQ CSVs to merge")
+    ask = sub.add_parser("ask", help="ask one or more questions")
+    ask.add_argument("questions", nargs="+")
+    ask.add_argument("--url", help="query a running service instead of an in-process index")
+    ask.add_argument("--topk", type=_positive_int, default=5)
+    ask.add_argument("--class", dest="sel_class", default="All")
+    ask.add_argument("--chapter", dest="sel_chap", default="All")
+    ask.add_argument("--csv", nargs="*", default=[], help="extra MCQ CSVs to merge (in-process only)")
+    ask.add_argument("--index", help="saved index directory to memory-map (in-process only)")
+    ask.add_argument("--mode", choices=MODES, default="tfidf", help="retrieval engine (in-process only)")
+    ask.add_argument("--lsa-dim", type=_positive_int, help="SVD components for --mode lsa/hybrid")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        start = time.perf_counter()
+        meta = load_bank(args.csv).save(args.out)
+        print(f"Wrote {args.out}: {meta['rows']} rows, {meta['terms']} terms, "
+              f"version {meta['version']} in {time.perf_counter() - start:.1f}s")
+        return
+
+    if args.cmd == "serve":
+        configure(enabled=args.metrics or None, slow_ms=args.slow_ms, slow_log=args.slow_log,
+                  metrics_file=args.metrics_file)
+        index = load_bank(args.csv, args.index, verify=args.verify)
+        retriever = BatchingRetriever(index, window_ms=args.window_ms,
+                                      max_batch=args.max_batch, workers=args.workers,
+                                      cache=QueryCache(args.cache_size, args.cache_ttl),
+                                      engine=make_engine(index, args.mode, args.lsa_dim))
+        server = QAServer((args.host, args.port), make_handler(retriever))
+        print(f"Serving {len(retriever.index)} Q/A rows on http://{args.host}:{args.port}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        if args.metrics_file:
+            REGISTRY.dump(args.metrics_file)
+        return
+
+    if args.url:
+        retriever = HTTPRetriever(args.url)
+    else:
+        index = load_bank(args.csv, args.index)
+        retriever = BatchingRetriever(index, engine=make_engine(index, args.mode, args.lsa_dim))
+    for q in args.questions:
+        results = retriever.search(q, topk=args.topk, sel_class=args.sel_class, sel_chap=args.sel_chap)
+        print(f"Q: {q}")
+        if not results:
+            print("   No close match found.")
+        for sc, r in results:
+            print(f"   {sc:.2f}  {r['answer']}  [Class {r['class']} | {r['chapter']}] {r['question']}")
+
+
+if __name__ == "__main__":
+    main()
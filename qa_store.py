@@ -0,0 +1,288 @@
+# qa_store.py — Streaming CSV ingestion and compact storage for the Q/A bank.
+# CSVs are read in chunks so memory stays bounded by the chunk size; each chunk
+# is validated against the class, chapter, question, answer schema and stored
+# with categorical class/chapter and arrow-backed (or interned) text.
+# QuestionStore is append-only: appending adds a segment and never copies rows.
+# FacetIndex maps class / chapter values to row ids for the Filter expander.
+# A store can be saved as flat arrays and reopened memory-mapped (MappedSegment),
+# which is how QAIndex.save / QAIndex.open persist the answer/metadata store.
+
+import hashlib
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+try:
+    import pyarrow  # noqa: F401
+    TEXT_DTYPE = "string[pyarrow]"
+except ImportError:
+    TEXT_DTYPE = None
+
+COLUMNS = ["class","chapter","question","answer"]
+CHUNK_ROWS = 50_000
+
+
+def peak_rss_mb():
+    # Process high-water RSS; None where the resource module is unavailable.
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def file_sha1(f, block=1 << 20):
+    # Hashes a file-like object in blocks and rewinds it.
+    h = hashlib.sha1()
+    f.seek(0)
+    for buf in iter(lambda: f.read(block), b""):
+        h.update(buf)
+    f.seek(0)
+    return h.hexdigest()
+
+
+def dataset_version(store):
+    # Content hash of the bank; used as the cache key for the shared index.
+    return hashlib.sha1(store.hash_rows().tobytes()).hexdigest()[:16]
+
+
+def _text(s):
+    s = s.astype(str).str.strip()
+    if TEXT_DTYPE:
+        return s.astype(TEXT_DTYPE)
+    return s.astype(object).map(sys.intern)
+
+
+def compact(df):
+    # Drops rows without a question or answer and converts to compact dtypes.
+    df = df[COLUMNS]
+    ok = df["question"].notna() & df["answer"].notna()
+    ok &= (df["question"].astype(str).str.strip() != "") & (df["answer"].astype(str).str.strip() != "")
+    df = df[ok]
+    return pd.DataFrame({
+        "class": df["class"].fillna("").astype(str).str.strip().astype("category"),
+        "chapter": df["chapter"].fillna("").astype(str).str.strip().astype("category"),
+        "question": _text(df["question"]),
+        "answer": _text(df["answer"]),
+    }).reset_index(drop=True)
+
+
+class IngestStats:
+    def __init__(self):
+        self.rows = 0
+        self.rejected = 0
+        self.seconds = 0.0
+        self.peak_rss_mb = None
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def __str__(self):
+        mem = f", peak RSS {self.peak_rss_mb:.0f} MB" if self.peak_rss_mb is not None else ""
+        return f"{self.rows} rows in {self.seconds:.2f}s ({self.rows_per_sec:,.0f} rows/s{mem})"
+
+
+def read_mcq_csv(src, chunksize=CHUNK_ROWS, stats=None):
+    # Yields compact chunks of an MCQ CSV. Header names are matched ignoring
+    # case and surrounding spaces; raises ValueError if a required column is
+    # missing or appears twice. Rows without question/answer are rejected.
+    stats = stats if stats is not None else IngestStats()
+    start = time.perf_counter()
+    reader = pd.read_csv(src, chunksize=chunksize, dtype=str, usecols=lambda c: c.strip().lower() in COLUMNS)
+    for chunk in reader:
+        chunk.columns = [c.strip().lower() for c in chunk.columns]
+        if chunk.columns.duplicated().any():
+            dups = sorted(set(chunk.columns[chunk.columns.duplicated()]))
+            raise ValueError(f"CSV has duplicate columns (ignoring case and spaces): {', '.join(dups)}")
+        if not set(COLUMNS).issubset(chunk.columns):
+            raise ValueError("CSV must contain columns: class, chapter, question, answer")
+        out = compact(chunk)
+        stats.rows += len(out)
+        stats.rejected += len(chunk) - len(out)
+        stats.seconds = time.perf_counter() - start
+        stats.peak_rss_mb = peak_rss_mb()
+        yield out
+
+
+class FacetIndex:
+    # Sorted int64 row ids per class, per chapter and per (class, chapter)
+    # pair, plus dropdown options with counts. extend() returns a new index
+    # that shares the id arrays of every facet the new segment doesn't touch.
+    def __init__(self, groups=None):
+        self.groups = groups or {}
+        self.classes = self._counts("class")
+        self.chapters = self._counts("chapter")
+        self.chapters_by_class = {}
+        for (kind, key), ids in sorted(self.groups.items()):
+            if kind == "pair":
+                self.chapters_by_class.setdefault(key[0], {})[key[1]] = len(ids)
+
+    def _counts(self, kind):
+        return {key: len(ids) for (k, key), ids in sorted(self.groups.items()) if k == kind}
+
+    def extend(self, segment, offset):
+        groups = dict(self.groups)
+        for kind, cols in (("class", "class"), ("chapter", "chapter"), ("pair", ["class", "chapter"])):
+            for key, pos in segment.groupby(cols, observed=True, sort=False).indices.items():
+                ids = pos.astype(np.int64) + offset
+                old = groups.get((kind, key))
+                groups[(kind, key)] = ids if old is None else np.concatenate([old, ids])
+        return FacetIndex(groups)
+
+    def rows(self, sel_class="All", sel_chap="All"):
+        # Row ids for a filter; None means the whole bank.
+        if sel_class == "All" and sel_chap == "All":
+            return None
+        if sel_chap == "All":
+            key = ("class", str(sel_class))
+        elif sel_class == "All":
+            key = ("chapter", str(sel_chap))
+        else:
+            key = ("pair", (str(sel_class), str(sel_chap)))
+        return self.groups.get(key, np.zeros(0, dtype=np.int64))
+
+    def options(self, sel_class="All"):
+        # Class and chapter dropdown values with row counts; chapters are
+        # limited to the selected class.
+        chapters = self.chapters if sel_class == "All" else self.chapters_by_class.get(str(sel_class), {})
+        return {"class": self.classes, "chapter": chapters}
+
+
+class MappedSegment:
+    # Read-only segment over memory-mapped arrays: class/chapter codes plus
+    # categories, and question/answer as one UTF-8 blob with row offsets.
+    def __init__(self, arrays, categories):
+        self.arrays = arrays
+        self.categories = categories
+
+    def __len__(self):
+        return len(self.arrays["class_codes"])
+
+    def get(self, j, col):
+        if col in ("class", "chapter"):
+            return self.categories[col][self.arrays[col + "_codes"][j]]
+        blob, offsets = self.arrays[col + "_blob"], self.arrays[col + "_offsets"]
+        return bytes(blob[offsets[j]:offsets[j + 1]]).decode("utf-8")
+
+    def frame(self, lo, hi):
+        hi = min(hi, len(self))
+        cols = {}
+        for col in ("class", "chapter"):
+            cols[col] = pd.Categorical.from_codes(self.arrays[col + "_codes"][lo:hi], self.categories[col])
+        for col in ("question", "answer"):
+            blob, offsets = self.arrays[col + "_blob"], self.arrays[col + "_offsets"]
+            raw = bytes(blob[offsets[lo]:offsets[hi]])
+            bounds = offsets[lo:hi + 1] - offsets[lo]
+            cols[col] = _text(pd.Series([raw[a:b].decode("utf-8") for a, b in zip(bounds[:-1], bounds[1:])], dtype=object))
+        return pd.DataFrame(cols)
+
+
+def _frames(seg, step=CHUNK_ROWS):
+    if isinstance(seg, MappedSegment):
+        for lo in range(0, len(seg), step):
+            yield seg.frame(lo, lo + step)
+    else:
+        yield seg
+
+
+class QuestionStore:
+    def __init__(self, segments=(), facets=None):
+        self.segments = tuple(segments)
+        self.offsets = np.cumsum([0] + [len(s) for s in self.segments])
+        if facets is None:
+            facets = FacetIndex()
+            for seg, off in zip(self.segments, self.offsets):
+                facets = facets.extend(seg, int(off))
+        self.facets = facets
+
+    @classmethod
+    def from_frame(cls, df):
+        return cls([compact(df)])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def append(self, segment):
+        # New store sharing the existing segments; readers of self are unaffected.
+        return QuestionStore(self.segments + (segment,), self.facets.extend(segment, len(self)))
+
+    def _locate(self, i):
+        k = int(np.searchsorted(self.offsets, i, side="right")) - 1
+        return self.segments[k], i - int(self.offsets[k])
+
+    def row(self, i):
+        seg, j = self._locate(i)
+        if isinstance(seg, MappedSegment):
+            return {c: seg.get(j, c) for c in COLUMNS}
+        return {c: str(seg[c].iat[j]) for c in COLUMNS}
+
+    def frames(self):
+        for seg in self.segments:
+            yield from _frames(seg)
+
+    def column(self, col):
+        for frame in self.frames():
+            yield from frame[col]
+
+    def hash_rows(self):
+        hashes = [pd.util.hash_pandas_object(f, index=False).to_numpy() for f in self.frames()]
+        return np.concatenate(hashes) if hashes else np.zeros(0, dtype=np.uint64)
+
+    def to_csv(self):
+        parts = [pd.DataFrame(columns=COLUMNS).to_csv(index=False)]
+        parts += [f.to_csv(index=False, header=False) for f in self.frames()]
+        return "".join(parts)
+
+    # -----------------------------
+    # Persistence
+    # -----------------------------
+    def save(self, path):
+        # Writes store_*.npy into directory `path`; returns the file names and
+        # the JSON-able metadata open() needs (categories and facet keys).
+        meta = {"categories": {"class": list(self.facets.classes), "chapter": list(self.facets.chapters)}}
+        codes = {col: [] for col in ("class", "chapter")}
+        text = {col: ([], [0]) for col in ("question", "answer")}
+        for frame in self.frames():
+            for col in codes:
+                codes[col].append(pd.Categorical(frame[col].astype(str), categories=meta["categories"][col]).codes)
+            for col, (parts, offsets) in text.items():
+                for v in frame[col]:
+                    b = str(v).encode("utf-8")
+                    parts.append(b)
+                    offsets.append(offsets[-1] + len(b))
+        arrays = {}
+        for col in codes:
+            arrays[col + "_codes"] = np.concatenate(codes[col]).astype(np.int32) if codes[col] else np.zeros(0, np.int32)
+        for col, (parts, offsets) in text.items():
+            arrays[col + "_blob"] = np.frombuffer(b"".join(parts), dtype=np.uint8)
+            arrays[col + "_offsets"] = np.asarray(offsets, dtype=np.int64)
+        keys = list(self.facets.groups)
+        ids = [self.facets.groups[k] for k in keys]
+        arrays["facet_ids"] = np.concatenate(ids).astype(np.int64) if ids else np.zeros(0, np.int64)
+        arrays["facet_offsets"] = np.cumsum([0] + [len(i) for i in ids]).astype(np.int64)
+        meta["facets"] = [[kind, list(key) if kind == "pair" else key] for kind, key in keys]
+        files = []
+        for name, arr in arrays.items():
+            np.save(os.path.join(path, f"store_{name}.npy"), arr)
+            files.append(f"store_{name}.npy")
+        return files, meta
+
+    @classmethod
+    def open(cls, path, meta):
+        # Memory-maps a store written by save(); pages are shared between processes.
+        names = ["class_codes", "chapter_codes", "question_blob", "question_offsets",
+                 "answer_blob", "answer_offsets", "facet_ids", "facet_offsets"]
+        arrays = {n: np.load(os.path.join(path, f"store_{n}.npy"), mmap_mode="r") for n in names}
+        categories = {col: np.asarray(meta["categories"][col], dtype=object) for col in ("class", "chapter")}
+        off = arrays["facet_offsets"]
+        groups = {}
+        for k, (kind, key) in enumerate(meta["facets"]):
+            groups[(kind, tuple(key) if kind == "pair" else key)] = arrays["facet_ids"][off[k]:off[k + 1]]
+        return cls([MappedSegment(arrays, categories)], FacetIndex(groups))
@@ -0,0 +1,413 @@
+# test_qa.py — Regression tests for the index, store, cache and quiz.
+# Run: python -m pytest -q
+
+import io
+import json
+import os
+import random
+import threading
+import numpy as np
+import pandas as pd
+import pytest
+
+import qa_cache
+import qa_index
+from mcqs import MCQS
+from qa_bench import synth_bank
+from qa_cache import QueryCache, _entry_bytes
+from qa_index import QAIndex, StaleIndexError, dataset_version
+from qa_quiz import Quiz, ShuffledPool
+from qa_service import BatchingRetriever, _rows_request, _search_request
+from qa_store import COLUMNS, IngestStats, QuestionStore, read_mcq_csv
+
+BASE = pd.DataFrame(MCQS, columns=COLUMNS)
+UPLOAD = pd.DataFrame([
+    ["12", "Zoology Extra", "What is the zorbulon organelle?", "A made-up organelle"],
+    ["12", "Zoology Extra", "Which gland secretes zorbulin during digestion?", "Pancreas"],
+    ["12", "Homeostasis", "Which organ filters urea from the blood?", "Kidney"],
+], columns=COLUMNS)
+QUERIES = ["powerhouse of the cell", "glycolysis", "zorbulon organelle", "which gland secretes insulin",
+           "what does the kidney filter"]
+
+
+def scores(index, q, **filters):
+    return {r["question"]: round(s, 5) for s, r in index.search(q, topk=10, **filters)}
+
+
+def test_upload_keeps_weights_until_rebalance():
+    index = QAIndex(BASE, rebalance_ratio=10)
+    before = index.weights_version
+    index.add_rows(UPLOAD)
+    index.search("glycolysis")
+    assert index.weights_version == before
+    full = QAIndex(pd.concat([BASE, UPLOAD], ignore_index=True))
+    np.testing.assert_array_equal(index.doc_freq, full.doc_freq)
+    assert scores(index, "zorbulon organelle")
+
+
+def test_rebalanced_upload_matches_full_rebuild():
+    index = QAIndex(BASE, rebalance_ratio=0)
+    index.add_rows(UPLOAD.iloc[:1])
+    index.add_rows(UPLOAD.iloc[1:])
+    full = QAIndex(pd.concat([BASE, UPLOAD], ignore_index=True))
+    assert len(index) == len(full)
+    for q in QUERIES:
+        got, want = scores(index, q), scores(full, q)
+        assert got.keys() == want.keys()
+        assert all(abs(got[k] - want[k]) < 1e-4 for k in want)
+    for sel in [("12", "All"), ("All", "Homeostasis"), ("12", "Zoology Extra")]:
+        assert scores(index, "gland organ", sel_class=sel[0], sel_chap=sel[1]).keys() == \
+            scores(full, "gland organ", sel_class=sel[0], sel_chap=sel[1]).keys()
+
+
+def test_exact_and_near_duplicates_collapse():
+    index = QAIndex(BASE)
+    rows = pd.DataFrame([
+        # Same question and answer after lowercasing and punctuation removal.
+        ["11", "Cell Structure", "WHAT IS THE BASIC UNIT OF LIFE", "cell."],
+        # Same answer, question differs only in stop words.
+        ["11", "Cell Structure", "Which organelle is known as the powerhouse of a cell?", "Mitochondria"],
+        # New, and repeated within the upload.
+        ["11", "Cell Structure", "What is the zorbulon organelle?", "A made-up organelle"],
+        ["11", "Cell Structure", "what is the zorbulon organelle", "A made-up organelle"],
+    ], columns=COLUMNS)
+    res = index.add_rows(rows)
+    assert (res["added"], res["exact_dups"], res["near_dups"]) == (1, 2, 1)
+    assert len(index) == len(BASE) + 1
+    assert index.add_rows(rows)["added"] == 0
+
+
+def test_near_duplicates_with_shared_answers(monkeypatch):
+    # Lettered answers put most of the bank in a few same-answer groups, which
+    # are matched by a sparse product; it must agree with the pairwise check.
+    bank = synth_bank(3000, answers=4)
+    near = bank.iloc[200:260].assign(question=lambda d: d["question"].str.replace("What is", "What are"))
+    other = near.assign(answer="Z")
+    upload = pd.concat([synth_bank(3100, seed=1, answers=4).iloc[3000:], near, other], ignore_index=True)
+    found = {}
+    for group in (0, 10**9):
+        monkeypatch.setattr(qa_index, "NEAR_DUP_GROUP", group)
+        res = QAIndex(bank).add_rows(upload)
+        found[group] = (res["added"], res["exact_dups"], res["near_dups"])
+    assert found[0] == found[10**9]
+    changed = int((near["question"] != bank["question"].iloc[200:260].values).sum())
+    assert changed and found[0][1:] == (len(near) - changed, changed)
+
+def test_same_source_is_applied_once():
+    index = QAIndex(BASE)
+    assert index.add_rows(UPLOAD, source="abc")["added"] == len(UPLOAD)
+    version = index.version
+    assert index.add_rows(UPLOAD, source="abc")["skipped"]
+    assert index.version == version
+
+
+def test_fork_keeps_uploads_private():
+    shared = QAIndex(BASE)
+    vocab, version = len(shared.vocab), shared.version
+    fork = shared.fork()
+    fork.add_rows(UPLOAD, source="abc")
+    assert len(fork) == len(BASE) + len(UPLOAD)
+    assert len(shared) == len(BASE) and len(shared.vocab) == vocab and shared.version == version
+    assert "Zoology Extra" not in shared.options()["chapter"]
+    assert scores(fork, "zorbulon organelle")
+    assert "What is the zorbulon organelle?" not in scores(shared, "zorbulon organelle")
+    assert shared.fork().add_rows(UPLOAD, source="abc")["added"] == len(UPLOAD)
+
+
+def test_upload_invalidates_only_affected_cache_entries():
+    cache = QueryCache()
+    retriever = BatchingRetriever(QAIndex(BASE), cache=cache)
+    stale = [("glycolysis", "All", "All"), ("glycolysis", "12", "All"), ("glycolysis", "All", "Homeostasis"),
+             ("zorbulon organelle", "11", "Enzymes")]
+    kept = [("glycolysis", "11", "All"), ("glycolysis", "12", "Respiration"), ("glycolysis", "All", "Enzymes")]
+    for q, c, ch in stale + kept:
+        retriever.search(q, sel_class=c, sel_chap=ch)
+    assert len(cache) == len(stale + kept)
+    assert retriever.add_rows(UPLOAD)["invalidated"] == len(stale)
+    assert len(cache) == len(kept)
+    hits = cache.hits
+    for q, c, ch in kept:
+        retriever.search(q, sel_class=c, sel_chap=ch)
+    assert cache.hits == hits + len(kept)
+
+
+def test_saved_index_round_trip(tmp_path):
+    path = str(tmp_path / "idx")
+    index = QAIndex(BASE)
+    index.add_rows(UPLOAD.iloc[:2], source="abc")
+    index.save(path)
+    opened = QAIndex.open(path, base_version=dataset_version(QuestionStore.from_frame(BASE)))
+    assert (len(opened), opened.version, opened.sources) == (len(index), index.version, index.sources)
+    assert opened.options("12") == index.options("12")
+    assert opened.to_csv() == index.to_csv()
+    assert all(opened.row(i) == index.row(i) for i in range(len(index)))
+    for q in QUERIES:
+        assert scores(opened, q) == pytest.approx(scores(index, q), abs=1e-4)
+    # Uploads extend the memory-mapped vocabulary, also through a fork.
+    fork = opened.fork()
+    assert fork.add_rows(UPLOAD.iloc[:2], source="abc")["skipped"]
+    fork.add_rows(UPLOAD.iloc[2:])
+    fork.save(str(tmp_path / "fork"))
+    full = QAIndex(pd.concat([BASE, UPLOAD], ignore_index=True))
+    reopened = QAIndex.open(str(tmp_path / "fork"))
+    assert len(opened) == len(BASE) + 2
+    for q in QUERIES:
+        assert scores(reopened, q) == pytest.approx(scores(full, q), abs=1e-4)
+
+
+def test_saved_index_rejects_stale_artifacts(tmp_path):
+    path = str(tmp_path / "idx")
+    QAIndex(BASE).save(path)
+    other = QuestionStore.from_frame(pd.concat([BASE, UPLOAD], ignore_index=True))
+    with pytest.raises(StaleIndexError, match="different built-in bank"):
+        QAIndex.open(path, base_version=dataset_version(other))
+    weights = os.path.join(path, "weights.npy")
+    original = open(weights, "rb").read()
+    with open(weights, "r+b") as f:
+        f.seek(-4, os.SEEK_END)
+        f.write(b"\0\0\0\1")
+    # Same size, different bytes: only the (opt-in) checksums notice.
+    QAIndex.open(path)
+    with pytest.raises(StaleIndexError, match="checksum"):
+        QAIndex.open(path, verify=True)
+    with open(weights, "ab") as f:
+        f.write(b"\0" * 8)
+    with pytest.raises(StaleIndexError, match="size"):
+        QAIndex.open(path)
+    with open(weights, "wb") as f:
+        f.write(original)
+    QAIndex.open(path, verify=True)
+    meta_path = os.path.join(path, "meta.json")
+    with open(meta_path, encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(dict(meta, format=meta["format"] + 1), f)
+    with pytest.raises(StaleIndexError, match="format"):
+        QAIndex.open(path)
+
+
+def test_shuffled_pool_grow_keeps_draws_unique():
+    for seed in range(20):
+        pool = ShuffledPool(5, random.Random(seed))
+        drawn = [pool.draw() for _ in range(3)]
+        pool.grow(9)
+        drawn += [pool.draw() for _ in range(pool.remaining)]
+        assert sorted(drawn) == list(range(9))
+        pool.reset()
+        assert sorted(pool.draw() for _ in range(9)) == list(range(9))
+
+
+def test_quiz_round_covers_every_question_once():
+    store = QuestionStore.from_frame(BASE)
+    keys = [("11", ch) for ch in store.facets.chapters_by_class["11"]]
+    quiz = Quiz(seed=0)
+    seen = [quiz.draw(store.facets, keys) for _ in range(quiz.progress(store.facets, keys)[1])]
+    assert not any(new_round for _, new_round in seen)
+    assert sorted(i for i, _ in seen) == sorted(int(i) for i in store.facets.groups[("class", "11")])
+    assert quiz.draw(store.facets, keys)[1]
+    # Rows uploaded mid-round join it without repeating drawn questions.
+    quiz = Quiz(seed=0)
+    drawn = [quiz.draw(store.facets, keys)[0] for _ in range(5)]
+    grown = store.append(UPLOAD.assign(**{"class": "11", "chapter": keys[0][1]}))
+    seen, total = quiz.progress(grown.facets, keys)
+    drawn += [quiz.draw(grown.facets, keys)[0] for _ in range(total - seen)]
+    assert sorted(drawn) == sorted(int(i) for i in grown.facets.groups[("class", "11")])
+
+
+@pytest.mark.parametrize("damage", ["missing_array", "missing_meta", "truncated_meta", "truncated_array"])
+def test_damaged_index_is_rejected_as_stale(tmp_path, damage):
+    path = str(tmp_path / "idx")
+    QAIndex(BASE).save(path)
+    if damage == "missing_array":
+        os.remove(os.path.join(path, "idf.npy"))
+    elif damage == "missing_meta":
+        os.remove(os.path.join(path, "meta.json"))
+    else:
+        name = os.path.join(path, "meta.json" if damage == "truncated_meta" else "store_facet_ids.npy")
+        with open(name, "r+b") as f:
+            f.truncate(os.path.getsize(name) // 2)
+    for verify in (True, False):
+        with pytest.raises(StaleIndexError, match="rebuild the index"):
+            QAIndex.open(path, verify=verify)
+
+
+def cache_key(q, sel_class="All", sel_chap="All"):
+    return ("w1", q, sel_class, sel_chap, 5)
+
+
+RESULTS = [(0.9, {"class": "11", "chapter": "Enzymes", "question": "What are enzymes?", "answer": "Catalysts"})]
+
+
+def test_cache_entries_expire_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(qa_cache.time, "monotonic", lambda: now[0])
+    cache = QueryCache(maxsize=10, ttl=60)
+    cache.put(cache_key("enzymes"), {"enzymes"}, RESULTS, cache.epoch)
+    now[0] += 59
+    assert cache.get(cache_key("enzymes")) == RESULTS
+    now[0] += 2
+    assert cache.get(cache_key("enzymes")) is None
+    assert (cache.expirations, cache.hits, cache.misses, len(cache), cache.bytes) == (1, 1, 1, 0, 0)
+
+
+def test_cache_evicts_least_recently_used():
+    cache = QueryCache(maxsize=2)
+    cache.put(cache_key("a"), {"a"}, RESULTS, cache.epoch)
+    cache.put(cache_key("b"), {"b"}, RESULTS, cache.epoch)
+    assert cache.get(cache_key("a")) is not None
+    cache.put(cache_key("c"), {"c"}, RESULTS, cache.epoch)
+    assert cache.get(cache_key("b")) is None
+    assert cache.get(cache_key("a")) is not None and cache.get(cache_key("c")) is not None
+    assert (len(cache), cache.evictions) == (2, 1)
+
+
+def test_cache_size_zero_stores_nothing():
+    cache = QueryCache(maxsize=0)
+    cache.put(cache_key("a"), {"a"}, RESULTS, cache.epoch)
+    assert cache.get(cache_key("a")) is None
+    assert (len(cache), cache.bytes, cache.misses) == (0, 0, 1)
+
+
+def test_cache_drops_results_computed_before_an_invalidation():
+    cache = QueryCache()
+    epoch = cache.epoch
+    cache.invalidate({"class": [], "chapter": [], "pair": [], "terms": ["enzymes"]})
+    cache.put(cache_key("enzymes"), {"enzymes"}, RESULTS, epoch)
+    assert cache.get(cache_key("enzymes")) is None
+    cache.put(cache_key("enzymes"), {"enzymes"}, RESULTS, cache.epoch)
+    assert cache.get(cache_key("enzymes")) == RESULTS
+
+
+def test_cache_bytes_track_stored_entries():
+    cache = QueryCache(maxsize=2)
+    sizes = {q: _entry_bytes(cache_key(q), RESULTS) for q in "abc"}
+    cache.put(cache_key("a"), {"a"}, RESULTS, cache.epoch)
+    cache.put(cache_key("a"), {"a"}, RESULTS, cache.epoch)
+    assert cache.bytes == sizes["a"]
+    cache.put(cache_key("b"), {"b"}, RESULTS, cache.epoch)
+    cache.put(cache_key("c"), {"c"}, RESULTS, cache.epoch)
+    assert cache.bytes == sizes["b"] + sizes["c"]
+    cache.invalidate({"class": [], "chapter": [], "pair": [], "terms": ["b"]})
+    assert cache.bytes == sizes["c"]
+    assert cache.stats()["bytes"] == cache.bytes
+
+
+def read_csv_text(text, **kw):
+    return list(read_mcq_csv(io.StringIO(text), **kw))
+
+
+def test_csv_headers_ignore_case_spaces_and_extra_columns():
+    chunks = read_csv_text(" Class ,CHAPTER,Question , answer,notes\n11,Enzymes,What are enzymes?,Catalysts,x\n")
+    assert list(chunks[0].columns) == COLUMNS
+    assert chunks[0].iloc[0].tolist() == ["11", "Enzymes", "What are enzymes?", "Catalysts"]
+
+
+@pytest.mark.parametrize("header, message", [
+    ("class,chapter,question", "must contain columns"),
+    ("class,chapter,question, Question ,answer", "duplicate columns.*question"),
+    ("Class,class,chapter,question,answer", "duplicate columns.*class"),
+])
+def test_csv_schema_errors(header, message):
+    with pytest.raises(ValueError, match=message):
+        read_csv_text(header + "\n" + ",".join(["x"] * len(header.split(","))) + "\n")
+
+
+def test_csv_rejects_rows_without_question_or_answer():
+    stats = IngestStats()
+    text = ("class,chapter,question,answer\n"
+            "11,Enzymes,What are enzymes?,Catalysts\n"
+            "11,Enzymes,,Catalysts\n"
+            "11,Enzymes,What is an active site?,   \n"
+            ",,What is DNA?,Deoxyribonucleic acid\n")
+    chunks = read_csv_text(text, stats=stats)
+    assert (stats.rows, stats.rejected) == (2, 2)
+    assert chunks[0]["question"].tolist() == ["What are enzymes?", "What is DNA?"]
+    assert chunks[0]["class"].tolist() == ["11", ""]
+
+
+def test_csv_is_read_chunk_by_chunk():
+    stats = IngestStats()
+    text = BASE.iloc[:7].to_csv(index=False)
+    chunks = read_csv_text(text, chunksize=3, stats=stats)
+    assert [len(c) for c in chunks] == [3, 3, 1]
+    assert stats.rows == 7 and stats.rejected == 0
+    merged = pd.concat(chunks, ignore_index=True).astype(str)
+    assert merged.values.tolist() == BASE.iloc[:7].astype(str).values.tolist()
+    assert len(QuestionStore(chunks)) == 7
+
+
+def test_search_request_validation():
+    assert _search_request({"q": "glycolysis"}) == ("glycolysis", 5, ("All", "All"))
+    assert _search_request({"q": "x", "topk": 3, "class": "11", "chapter": "Enzymes"}) == ("x", 3, ("11", "Enzymes"))
+    for bad in [[1], "q", {"q": None}, {"q": 5}, {"q": "x", "topk": 0}, {"q": "x", "topk": "3"},
+                {"q": "x", "topk": True}, {"q": "x", "topk": 2.5}, {"q": "x", "class": None}]:
+        with pytest.raises(ValueError):
+            _search_request(bad)
+
+
+def test_rows_request_validation():
+    df, source = _rows_request({"rows": [dict(zip(COLUMNS, ["11", "Enzymes", "Q?", "A"]))], "source": "abc"})
+    assert df.values.tolist() == [["11", "Enzymes", "Q?", "A"]] and source == "abc"
+    assert _rows_request({"rows": []})[1] is None
+    for bad in [None, [], {"rows": "x"}, {"rows": [1]}, {"rows": [{}], "source": 3}]:
+        with pytest.raises(ValueError):
+            _rows_request(bad)
+
+
+class RecordingEngine:
+    # Scores with the index and records batch sizes; fails when asked to.
+    def __init__(self, index, error=None):
+        self.index, self.error, self.batches = index, error, []
+        self.weights_version = index.weights_version
+
+    def search_batch(self, queries, topk=5, filters=None):
+        self.batches.append(len(queries))
+        if self.error is not None:
+            raise self.error
+        return self.index.search_batch(queries, topk=topk, filters=filters)
+
+
+def run_concurrently(retriever, calls):
+    # Submits every call at once from its own thread; returns results or exceptions.
+    barrier, out = threading.Barrier(len(calls)), [None] * len(calls)
+
+    def ask(i, q, topk, sel_class, sel_chap):
+        barrier.wait()
+        try:
+            out[i] = retriever.search(q, topk=topk, sel_class=sel_class, sel_chap=sel_chap, timeout=10)
+        except Exception as e:
+            out[i] = e
+
+    threads = [threading.Thread(target=ask, args=(i, *c)) for i, c in enumerate(calls)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out
+
+
+CALLS = [("glycolysis", 1, "All", "All"), ("glycolysis", 5, "MDCAT", "All"), ("enzymes", 3, "11", "Enzymes"),
+         ("mitosis", 2, "All", "Cell Division"), ("heart", 4, "12", "All"), ("cell", 5, "11", "All")]
+
+
+def test_batched_searches_get_their_own_results():
+    index = QAIndex(BASE)
+    engine = RecordingEngine(index)
+    retriever = BatchingRetriever(index, window_ms=200, workers=2, engine=engine)
+    out = run_concurrently(retriever, CALLS)
+    assert sum(engine.batches) == len(CALLS) and max(engine.batches) > 1
+    for (q, topk, c, ch), got in zip(CALLS, out):
+        want = index.search(q, topk=topk, sel_class=c, sel_chap=ch)
+        assert [(round(sc, 5), r) for sc, r in got] == [(round(sc, 5), r) for sc, r in want]
+        assert len(got) <= topk and all(c in ("All", r["class"]) and ch in ("All", r["chapter"]) for _, r in got)
+
+
+def test_worker_errors_reach_every_caller():
+    index = QAIndex(BASE)
+    engine = RecordingEngine(index, error=RuntimeError("engine down"))
+    retriever = BatchingRetriever(index, window_ms=200, workers=1, engine=engine)
+    out = run_concurrently(retriever, CALLS)
+    assert all(isinstance(e, RuntimeError) and str(e) == "engine down" for e in out)
+    assert sum(engine.batches) == len(CALLS)
+    engine.error = None
+    assert retriever.search("glycolysis", topk=1)[0][1]["answer"] == "Cytoplasm"